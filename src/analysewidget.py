@@ -9,6 +9,9 @@ from PyQt5 import uic
 from boardwidget import *
 from engines import *
 from evalbar import EvalBar
+from enginebridge import EngineBridge
+from analysiscache import AnalysisCache
+from analysisstore import AnalysisStore
 from util import getMainWindow
 
 
@@ -67,6 +70,18 @@ class AnalyseWidget(QWidget):
         self.evalBar = EvalBar(self.frame_3)
         self.evalbar_layout.addWidget(self.evalBar,0,0)
 
+        # moves the parsed engine output to the gui thread with a limited frame rate
+        self.engine_bridge = EngineBridge(parent=self)
+        self.engine_bridge.records_ready.connect(self._process_engine_records)
+
+        # remembers the deepest analysis of visited positions and the key of the position currently analysed
+        self.analysis_cache = AnalysisCache()
+        self.analysis_key = None
+
+        # keeps the analysis across sessions
+        self.analysis_store = AnalysisStore()
+        self.analysis_store_key = None
+
         self._update_board_widgets()
 
     def _current_engine(self):
@@ -80,51 +95,58 @@ class AnalyseWidget(QWidget):
         else:
             return None
 
-    def _process_engine_line(self, line):
+    def _engine_record_received(self, record):
+        # called on the reader thread of the engine. widgets must not be touched here
+        # lines which only report the current move do not change anything we display
+        if record.currmove is not None:
+            return
+        self.engine_bridge.submit(record)
+
+    def _process_engine_records(self, records):
+        # called on the gui thread with the latest record of each pv
+        for record in records:
+            # records which are shallower than the cached analysis only update the search statistics
+            if self.analysis_key is None or self.analysis_cache.store(self.analysis_key, record):
+                self._process_engine_record(record)
+                # only results deeper than what we knew are written to disk
+                if self.analysis_store_key is not None:
+                    self.analysis_store.store(self.analysis_store_key, record)
+            else:
+                self._process_engine_record(record, statistics_only=True)
+
+        # redraw the arrows once for all pvs
+        self.board_widget.update_arrows()
+
+    def _process_engine_record(self, record, statistics_only=False):
         # we assume that all engines only follow the uci protocol. This is checked when selecting the engine
-        if 'info' not in line:
+        # write all the labels which are contained in the record
+        for label, value in ((self.   nodes_label, record.nodes),
+                             (self.     nps_label, record.nps),
+                             (self.   depth_label, record.depth),
+                             (self.seldepth_label, record.seldepth),
+                             (self.    time_label, record.time),
+                             (self.  tbhits_label, record.tbhits)):
+            if value is not None:
+                label.setText(str(value))
+
+        if statistics_only:
             return
 
-        # create a function to fill the label with the correct value
-        func = lambda label, split, value: label.setText(
-            split[split.index(value) + 1] if value in split and len(split) > split.index(value) + 1 else label.text())
-
-        # split the string
-        split = line.lower().split()
-
-        # write all the labels
-        func(self.   nodes_label, split, 'nodes')
-        func(self.     nps_label, split, 'nps')
-        func(self.   depth_label, split, 'depth')
-        func(self.seldepth_label, split, 'seldepth')
-        func(self.    time_label, split, 'time')
-        func(self.  tbhits_label, split, 'tbhits')
-
-
         # update the score
-        if 'mate' in split and len(split) > split.index('mate') + 1:
-            self._update_score(mate=split[split.index('mate')+1])
-        elif 'score' in split and len(split) > split.index('score') + 2:
-            self._update_score(score=split[split.index('score')+2])
+        if record.score_mate is not None:
+            self._update_score(mate=record.score_mate)
+        elif record.score_cp is not None:
+            self._update_score(score=record.score_cp)
 
         # processing the pv
-        pv_index = 0
-        if 'multipv' in split and split.index('multipv')+1 < len(split):
-            pv_index = int(split[split.index('multipv')+1]) - 1
+        pv_index = record.multipv - 1
 
         # ignore more than 5 pvs
         if pv_index >= 5:
             return
 
         # return if there is no pv or the pv is empty
-        if 'pv' not in split or split[-1] == 'pv':
-            return
-
-        # get the pv
-        pv = split[split.index('pv') + 1:]
-
-        # if the pv is empty, dont do anything
-        if len(pv) == 0:
+        if not record.pv:
             return
 
         # make sure there are enough arrows in the board widget
@@ -132,11 +154,11 @@ class AnalyseWidget(QWidget):
             self.board_widget.arrows += [BoardArrow(0,0,0)] * (5 - len(self.board_widget.arrows))
 
         # get the first move and display that as an arrow
-        move = chess.Move.from_uci(pv[0])
+        move = chess.Move.from_uci(record.pv[0])
         self.board_widget.arrows[pv_index] = BoardArrow(0.3 - pv_index * 0.05, move.from_square, move.to_square)
 
         # display the entire pv in the correct slot
-        pv_string = ' '.join(pv)
+        pv_string = ' '.join(record.pv)
         self.pv_buttons[pv_index].setText(pv_string)
 
     def _change_page(self, index):
@@ -147,14 +169,54 @@ class AnalyseWidget(QWidget):
     def _retrieve_search_fen_and_moves(self):
         # retrieves the fen and moves which will be given to the engine in the format
         # setposition fen {fen} moves {moves}
-        return self.board_widget.board.fen(), None
+        # the engine receives the whole game so it knows the history (e.g. for repetitions) and can keep its hash
+        game = self.board_widget.game
+        moves = game.cursor.moves()
+        if len(moves) == 0:
+            return self.board_widget.board.fen(), None
+        return game.root.board().fen(), ' '.join(move.uci() for move in moves)
 
     def _update_search(self):
         # update the search if a move has happened or the board state changed
-        if self._current_engine() is not None:
-            fen,moves=self._retrieve_search_fen_and_moves()
-            # send the search command
-            self._current_engine().search(fen,moves)
+        engine = self._current_engine()
+        if engine is None or not self.analysetoggle_button.isChecked():
+            return
+
+        fen,moves=self._retrieve_search_fen_and_moves()
+        # send the search command
+        engine.search(fen,moves)
+        # output of the previous position which has not been displayed yet is outdated
+        self.engine_bridge.clear()
+        self._show_known_analysis(engine)
+
+    def options_applied(self, name):
+        # the engine continues the running analysis with other options (see Engine.apply_options). its output
+        # belongs to another configuration from now on, so it is cached and stored under other keys
+        engine = self._current_engine()
+        if engine is None or name != self.engine_combo.currentText() or not self.analysetoggle_button.isChecked():
+            return
+        self.engine_bridge.clear()
+        self._show_known_analysis(engine)
+
+    def _show_known_analysis(self, engine):
+        # show the analysis of this position immediately if it has been analysed before. the search continues
+        # from there and only replaces it once it got deeper
+        self._reset_pv()
+        self.analysis_key = self.analysis_cache.key(self.board_widget.board, engine)
+        self.analysis_store_key = self.analysis_store.key(self.analysis_key[0], engine)
+        cached = self.analysis_cache.lookup(self.analysis_key)
+
+        # fall back to the analysis of previous sessions
+        if cached is None:
+            cached = self.analysis_store.lookup(self.analysis_store_key)
+            if cached is not None:
+                for record in cached:
+                    self.analysis_cache.store(self.analysis_key, record)
+
+        if cached is not None:
+            for record in cached:
+                self._process_engine_record(record)
+        self.board_widget.update_arrows()
 
     def _update_score(self, score=None, mate=None):
         # update the score display
@@ -181,10 +243,9 @@ class AnalyseWidget(QWidget):
         self.fen_edit.setText(self.board_widget.board.fen())
     def _set_fen(self, fen):
         try:
-            self.board_widget.board.set_fen(fen)
+            self.board_widget.set_fen(fen)
             self._update_board_widgets()
             self._board_changed()
-            self.board_widget.refresh_board()
         except:
             pass
 
@@ -193,6 +254,10 @@ class AnalyseWidget(QWidget):
         self._update_board_widgets()
 
 
+    def _engine_pool(self):
+        # the pool keeping the engines warm between analyses
+        return getMainWindow().getEngineConfigWidget().engine_pool
+
     def stop_analysis(self):
         # stop the analysis
         # make sure the toggle button is toggle OFF
@@ -201,32 +266,32 @@ class AnalyseWidget(QWidget):
         # we can select other engines
         self.engine_combo.setEnabled(True)
 
-        # if there is no engine available, no need to exit
+        # if there is no engine available, no need to release it
         if self._current_engine() is None:
             return
 
-        # exit the current engine. the function checks if the engine is running
-        self._current_engine().exit()
+        # give the engine back to the pool. it keeps running so the next analysis does not need to restart it
+        self._engine_pool().release(self.engine_combo.currentText())
+        self.analysis_key = None
+        self.analysis_store_key = None
 
     def start_analysis(self):
         # cannot start analysis if no engine is selected
         if self._current_engine() is None:
             return
-        # listen to the output and wait 0.1 seconds
-        self._current_engine().listen(self._process_engine_line)
-        time.sleep(0.1)
         # reset any pv displayed
         self._reset_pv()
-        # try to start the engine
-        if self._current_engine().start():
+        # get a running engine from the pool. it is only started if no warm instance exists
+        engine = self._engine_pool().acquire(self.engine_combo.currentText())
+        if engine is not None:
+            # listen to the parsed output
+            engine.listen_info(self._engine_record_received)
             # make sure the toggle button is toggle ON
             self.analysetoggle_button.setChecked(True)
             # make sure we cannot select other engines
             self.engine_combo.setEnabled(False)
-            # send the options
-            self._current_engine().send_options()
-            # sleep a bit so that the engine can start
-            time.sleep(0.2)
+            # wait until the engine has processed the options
+            engine.is_ready()
             # update the search and give the search command on the current position
             self._update_search()
 
@@ -257,15 +322,17 @@ class AnalyseWidget(QWidget):
         for i in self.pv_buttons:
             i.setText("")
 
-        # make sure there are enough arrows in the board widget
-        if len(self.board_widget.arrows) < 5:
-            self.board_widget.arrows += [BoardArrow(0, 0, 0)] * (5 - len(self.board_widget.arrows))
+        # remove the arrows of the previous position
+        self.board_widget.arrows = [BoardArrow(0, 0, 0)] * 5
 
     def resizeEvent(self, e):
-        self.boardroot_frame.setMinimumWidth(self.boardroot_frame.height())
+        # changing the constraints makes the layout resize everything again, so they are only set if they changed
+        if self.boardroot_frame.minimumWidth() != self.boardroot_frame.height():
+            self.boardroot_frame.setMinimumWidth(self.boardroot_frame.height())
         # self.boardroot_frame.setMaximumWidth(self.boardroot_frame.height())
 
         for i in range(6):
             width = self.setpiece_buttons[i].width()
-            self.setpiece_buttons[i].setMinimumHeight(width)
-            self.setpiece_buttons[i].setMaximumHeight(width)
+            if self.setpiece_buttons[i].minimumHeight() != width or self.setpiece_buttons[i].maximumHeight() != width:
+                self.setpiece_buttons[i].setMinimumHeight(width)
+                self.setpiece_buttons[i].setMaximumHeight(width)
@@ -0,0 +1,96 @@
+import hashlib
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+
+# the default amount of memory the analysis cache may use (in bytes)
+ANALYSIS_CACHE_MEMORY = 32 * 1024 * 1024
+
+# rough memory estimate of a cached record and of each move inside its pv (in bytes)
+_RECORD_SIZE = 400
+_PV_MOVE_SIZE = 60
+
+
+def options_fingerprint(engine):
+    # hashes the option values of the engine. the same position analysed with other options is stored separately
+    options = engine.settings['options']
+    values = ';'.join(f"{name}={options[name].get('value')}" for name in sorted(options))
+    return hashlib.sha1(values.encode('utf8')).hexdigest()
+
+
+def engine_identity(engine):
+    # identifies the engine which produced an analysis. the same configuration with another binary or other option
+    # values is different
+    return engine.settings['bin'], engine.information['name'], options_fingerprint(engine)
+
+
+class AnalysisCache:
+
+    def __init__(self, memory_cap=ANALYSIS_CACHE_MEMORY):
+        self.memory_cap = memory_cap
+        self.memory = 0
+
+        # maps (zobrist hash, engine identity) to a dict of multipv index -> deepest InfoRecord.
+        # the order of the entries is the order of their last use
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(board, engine):
+        return chess.polyglot.zobrist_hash(board), engine_identity(engine)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key):
+        # returns the cached records sorted by their multipv index or None if the position is unknown
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return [entry[index] for index in sorted(entry)]
+
+    def store(self, key, record):
+        # stores the record if it is the deepest one seen for its pv. returns True if the record has been stored
+        if not record.pv or not record.has_score() or record.depth is None:
+            return False
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {}
+        else:
+            self._entries.move_to_end(key)
+
+        previous = entry.get(record.multipv)
+        if previous is not None:
+            if previous.depth > record.depth:
+                return False
+            self.memory -= self._size(previous)
+
+        entry[record.multipv] = record
+        self.memory += self._size(record)
+
+        # remove the least recently used positions until we fit into the memory again
+        while self.memory > self.memory_cap and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.memory -= sum(self._size(r) for r in evicted.values())
+            self.evictions += 1
+        return True
+
+    def clear(self):
+        self._entries.clear()
+        self.memory = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'entries': len(self._entries), 'memory': self.memory, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0, 'evictions': self.evictions}
+
+    def _size(self, record):
+        return _RECORD_SIZE + _PV_MOVE_SIZE * len(record.pv)
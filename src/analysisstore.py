@@ -0,0 +1,203 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from queue import Queue, Empty
+
+from uciparser import InfoRecord
+from analysiscache import options_fingerprint
+
+# the default location of the store
+ANALYSIS_STORE_PATH = os.path.join(os.path.dirname(__file__), "analysis.sqlite")
+# the maximum amount of rows (one per position, engine, options and pv) kept inside the store
+ANALYSIS_STORE_MAX_ROWS = 500000
+# the maximum size of the store file in bytes
+ANALYSIS_STORE_MAX_BYTES = 256 * 1024 * 1024
+# the writer commits at most this many seconds after a record has been stored
+ANALYSIS_STORE_COMMIT_INTERVAL = 2.0
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    zobrist     INTEGER NOT NULL,
+    engine      TEXT    NOT NULL,
+    options     TEXT    NOT NULL,
+    multipv     INTEGER NOT NULL,
+    depth       INTEGER NOT NULL,
+    score_cp    INTEGER,
+    score_mate  INTEGER,
+    bound       TEXT,
+    pv          TEXT    NOT NULL,
+    last_used   REAL    NOT NULL,
+    PRIMARY KEY (zobrist, engine, options, multipv)
+);
+CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis (last_used);
+"""
+
+# keeps the deeper result if a position has been stored before
+_UPSERT = """
+INSERT INTO analysis (zobrist, engine, options, multipv, depth, score_cp, score_mate, bound, pv, last_used)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (zobrist, engine, options, multipv) DO UPDATE SET
+    depth = excluded.depth, score_cp = excluded.score_cp, score_mate = excluded.score_mate,
+    bound = excluded.bound, pv = excluded.pv, last_used = excluded.last_used
+WHERE excluded.depth >= analysis.depth
+"""
+
+_TOUCH = "UPDATE analysis SET last_used = ? WHERE zobrist = ? AND engine = ? AND options = ?"
+
+
+class AnalysisStore:
+
+    def __init__(self, path=ANALYSIS_STORE_PATH, max_rows=ANALYSIS_STORE_MAX_ROWS,
+                 max_bytes=ANALYSIS_STORE_MAX_BYTES, commit_interval=ANALYSIS_STORE_COMMIT_INTERVAL):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.commit_interval = commit_interval
+
+        self.reads = 0
+        # stored records and the positions marked as used which have been committed
+        self.writes = 0
+        self.touches = 0
+        self.commits = 0
+        # batches which could not be written (e.g. the disk is full or the file is locked)
+        self.errors = 0
+        # upper bound of the rows in the store. it is counted exactly only once it exceeds the limit
+        self._rows = None
+
+        # the connection used for reading, the writer thread has its own one
+        self._connection = self._connect()
+        self._connection.executescript(_SCHEMA)
+
+        # pending writes, None stops the writer
+        self._queue = Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @staticmethod
+    def key(zobrist, engine):
+        # sqlite only stores signed 64 bit integers
+        if zobrist >= 1 << 63:
+            zobrist -= 1 << 64
+        return zobrist, engine.information['name'] or engine.settings['bin'], options_fingerprint(engine)
+
+    def lookup(self, key):
+        # returns the stored records sorted by their multipv index or None if the position is unknown
+        rows = self._connection.execute(
+            "SELECT multipv, depth, score_cp, score_mate, bound, pv FROM analysis "
+            "WHERE zobrist = ? AND engine = ? AND options = ? ORDER BY multipv", key).fetchall()
+        self.reads += 1
+        if not rows:
+            return None
+
+        # remember the position has been used so compaction keeps it
+        self._queue.put((_TOUCH, (time.time(),) + key))
+
+        records = []
+        for multipv, depth, score_cp, score_mate, bound, pv in rows:
+            record = InfoRecord()
+            record.multipv = multipv
+            record.depth = depth
+            record.score_cp = score_cp
+            record.score_mate = score_mate
+            record.bound = bound
+            record.pv = pv.split()
+            records.append(record)
+        return records
+
+    def store(self, key, record):
+        # queues the record for the writer thread. records without a pv or score are ignored
+        if not record.pv or not record.has_score() or record.depth is None:
+            return
+        self._queue.put((_UPSERT, key + (record.multipv, record.depth, record.score_cp, record.score_mate,
+                                         record.bound, ' '.join(record.pv), time.time())))
+
+    def close(self):
+        # writes all pending records and stops the writer
+        self._queue.put(None)
+        self._writer.join()
+        self._connection.close()
+
+    def stats(self):
+        return {'reads': self.reads, 'writes': self.writes, 'touches': self.touches, 'commits': self.commits,
+                'errors': self.errors}
+
+    def _write_loop(self):
+        connection = self._connect()
+        running = True
+        while running:
+            # wait for the first write, then collect everything arriving within the commit interval into one batch
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.commit_interval
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except Empty:
+                    break
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+
+            if not batch:
+                continue
+            # a failing batch is rolled back and dropped. the writer keeps running so later records are still stored
+            try:
+                with connection:
+                    for statement, arguments in batch:
+                        connection.execute(statement, arguments)
+                upserts = sum(1 for statement, arguments in batch if statement is _UPSERT)
+                self.writes += upserts
+                self.touches += len(batch) - upserts
+                self.commits += 1
+                if self._rows is not None:
+                    self._rows += upserts
+                self._enforce_limits(connection)
+            except sqlite3.Error as error:
+                self.errors += 1
+                log.warning("could not write to %s: %s", self.path, error)
+
+        self.compact(connection)
+        connection.close()
+
+    def _enforce_limits(self, connection):
+        # removes the least recently used rows if there are too many or the file got too large. every stored record
+        # is counted as a new row, the rows are only counted exactly once that estimate exceeds the limit
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        pages = connection.execute("PRAGMA page_count").fetchone()[0]
+        if self._rows is not None and self._rows <= self.max_rows and page_size * pages <= self.max_bytes:
+            return
+        rows = self._rows = connection.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+        if rows <= self.max_rows and page_size * pages <= self.max_bytes:
+            return
+
+        # shrink to 90% so we do not have to clean up after every commit
+        keep = int(min(rows, self.max_rows) * 0.9)
+        if page_size * pages > self.max_bytes:
+            keep = min(keep, int(rows * self.max_bytes / (page_size * pages) * 0.9))
+        with connection:
+            connection.execute("DELETE FROM analysis WHERE rowid IN "
+                               "(SELECT rowid FROM analysis ORDER BY last_used LIMIT ?)", (rows - keep,))
+        self._rows = keep
+        self.compact(connection)
+
+    def compact(self, connection=None):
+        # gives the space of deleted rows back to the file system once a quarter of the file is unused
+        # (fails with 'database is locked' while the other connection is reading, it is tried again next time)
+        connection = connection or self._connection
+        try:
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+            pages = connection.execute("PRAGMA page_count").fetchone()[0]
+            if free * 4 > pages:
+                connection.execute("VACUUM")
+        except sqlite3.OperationalError as error:
+            log.warning("could not compact %s: %s", self.path, error)
@@ -0,0 +1,228 @@
+import time
+
+import chess
+from PyQt5.QtCore import QObject, QTimer, QEasingCurve, Qt
+
+# length of a transition in milliseconds
+ANIMATION_DURATION = 400
+# time between two frames in milliseconds. the pieces are placed by the time which passed, so a late frame skips the
+# frames in between instead of drawing them one after another
+ANIMATION_FRAME_BUDGET = 16
+
+
+def _cell(square):
+    # the column and row of the square on the board with white at the bottom
+    return float(chess.square_file(square)), float(7 - chess.square_rank(square))
+
+
+def follow(board, moves):
+    # plays the moves from the position and tracks where the pieces go. returns a dict mapping the squares of the
+    # pieces at the end to the squares they started on, the pieces which were captured on the way as (start, square,
+    # piece) and the position at the end
+    board = board.copy(stack=False)
+    origins = {square: square for square in board.piece_map()}
+    captured = []
+    for move in moves:
+        before = board.piece_map()
+        board.push(move)
+        after = board.piece_map()
+
+        vacated = [square for square, piece in before.items() if after.get(square) != piece]
+        filled = [square for square, piece in after.items() if before.get(square) != piece]
+
+        # match the pieces which arrived with the ones which left. the moving piece is preferred, the rook of a
+        # castling is matched by its type and a promoted pawn by the from square of the move
+        moved = {}
+        for square in filled:
+            piece = after[square]
+            candidates = [other for other in vacated if other not in moved.values()
+                          and before[other].color == piece.color and before[other].piece_type == piece.piece_type]
+            candidates.sort(key=lambda other: other != move.from_square)
+            if not candidates and move.promotion and move.from_square in vacated:
+                candidates = [move.from_square]
+            if candidates:
+                moved[square] = candidates[0]
+
+        for square in vacated:
+            if square not in moved.values():
+                captured.append((origins[square], square, before[square]))
+        origins = {**{square: origin for square, origin in origins.items() if square not in vacated},
+                   **{square: origins[other] for square, other in moved.items()}}
+    return origins, captured, board
+
+
+class Sprite:
+
+    def __init__(self, piece, start, end, square, begin, fade=None):
+        # a piece moving from one cell to another. the square is where it lands and is not drawn by the board until
+        # the piece arrived (None for a captured piece which fades out). fade is the (start, end) opacity
+        self.piece = piece
+        self.start = start
+        self.end = end
+        self.square = square
+        self.begin = begin
+        self.fade = fade
+        self.pos = start
+        self.opacity = 1.0 if fade is None else fade[0]
+
+
+class AnimationScheduler(QObject):
+
+    def __init__(self, invalidate, duration=ANIMATION_DURATION, frame_budget=ANIMATION_FRAME_BUDGET, parent=None):
+        # moves any number of pieces with a single timer. invalidate(column, row) is called for every cell a piece
+        # covered or covers now so the board can repaint it
+        super().__init__(parent)
+        self.invalidate = invalidate
+        self.duration = duration
+        self.curve = QEasingCurve(QEasingCurve.InOutQuart)
+
+        self.sprites = []
+        # maps the squares the pieces land on to their sprite
+        self.hidden = {}
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._frame)
+        self.set_frame_budget(frame_budget)
+        self._last_frame = None
+        # the transition started since the last frame as (board, moves, backward, end, sprites before it). the next
+        # one is merged into it if it continues it
+        self._pending = None
+
+        self.transitions = 0
+        self.moves = 0
+        self.frames = 0
+        self.skipped = 0
+        self.peak = 0
+
+    def set_frame_budget(self, frame_budget):
+        self.frame_budget = frame_budget
+        self.timer.setInterval(frame_budget)
+
+    def running(self):
+        return len(self.sprites) > 0
+
+    def transition(self, board, moves, backward=False):
+        # animates the moves played from the position. several moves are shown as one transition in which every
+        # piece goes straight to its final square. backward animates taking the moves back, the board then shows the
+        # position before the moves. pieces which are still moving continue from where they are. transitions which
+        # follow each other within a frame are shown as one from the first position to the last
+        if len(moves) == 0:
+            return
+        count = len(moves)
+        origins, captured, end = follow(board, moves)
+
+        merged = False
+        if self._pending is not None:
+            pending_board, pending_moves, pending_backward, pending_end, pending_sprites = self._pending
+            if backward == pending_backward:
+                if not backward and board == pending_end:
+                    board, moves, merged = pending_board, pending_moves + moves, True
+                elif backward and end == pending_board:
+                    moves, merged = moves + pending_moves, True
+            if merged:
+                # no frame moved the pieces since, so the sprites from before the pending transition are still right
+                for sprite in self.sprites:
+                    if sprite not in pending_sprites:
+                        self.invalidate(*sprite.pos)
+                        self.invalidate(*sprite.end)
+                self.sprites = pending_sprites
+                self._update_hidden()
+                origins, captured, end = follow(board, moves)
+        self._pending = (board, moves, backward, end, self.sprites)
+        start_pieces, end_pieces = board.piece_map(), end.piece_map()
+
+        # the pieces which are moving land on the squares of the position which is shown so far
+        current = self.hidden
+        def position(square):
+            return current[square].pos if square in current else _cell(square)
+
+        now = time.monotonic()
+        sprites = []
+        # the sprites of the pieces which move again (or are taken back) are replaced
+        replaced = []
+        for square, origin in origins.items():
+            if square == origin:
+                continue
+            if backward:
+                sprites.append(Sprite(start_pieces[origin], position(square), _cell(origin), origin, now))
+                replaced.append(current.get(square))
+            else:
+                sprites.append(Sprite(end_pieces[square], position(origin), _cell(square), square, now))
+                replaced.append(current.get(origin))
+
+        # captured pieces which are still fading out when they are taken back fade in from where they are
+        fading = {sprite.end: sprite for sprite in self.sprites if sprite.square is None}
+        for origin, square, piece in captured:
+            if backward:
+                sprite = Sprite(piece, _cell(square), _cell(origin), origin, now, (0.0, 1.0))
+                if _cell(square) in fading:
+                    sprite.opacity = fading[_cell(square)].opacity
+                    sprite.fade = (sprite.opacity, 1.0)
+                    replaced.append(fading[_cell(square)])
+            else:
+                sprite = Sprite(piece, position(origin), _cell(square), None, now, (1.0, 0.0))
+                replaced.append(current.get(origin))
+            sprites.append(sprite)
+
+        for sprite in replaced:
+            if sprite is not None:
+                self.invalidate(*sprite.pos)
+        self.sprites = [sprite for sprite in self.sprites if sprite not in replaced] + sprites
+        self._update_hidden()
+        for sprite in sprites:
+            self.invalidate(*sprite.start)
+            self.invalidate(*sprite.end)
+
+        if not merged:
+            self.transitions += 1
+        self.moves += count
+        self.peak = max(self.peak, len(self.sprites))
+        if not self.timer.isActive():
+            self._last_frame = now
+            self.timer.start()
+
+    def finish(self):
+        # puts all pieces on their squares right away
+        for sprite in self.sprites:
+            self.invalidate(*sprite.pos)
+            self.invalidate(*sprite.end)
+        self.sprites = []
+        self.hidden = {}
+        self._pending = None
+        self.timer.stop()
+
+    def stats(self):
+        return {'transitions': self.transitions, 'moves': self.moves, 'frames': self.frames,
+                'skipped': self.skipped, 'peak': self.peak}
+
+    def _update_hidden(self):
+        self.hidden = {sprite.square: sprite for sprite in self.sprites if sprite.square is not None}
+
+    def _frame(self):
+        now = time.monotonic()
+        self.frames += 1
+        late = int((now - self._last_frame) * 1000 / self.frame_budget) - 1
+        if late > 0:
+            self.skipped += late
+        self._last_frame = now
+        self._pending = None
+
+        running = []
+        for sprite in self.sprites:
+            progress = min(1.0, (now - sprite.begin) * 1000 / self.duration)
+            value = self.curve.valueForProgress(progress)
+            self.invalidate(*sprite.pos)
+            sprite.pos = (sprite.start[0] + (sprite.end[0] - sprite.start[0]) * value,
+                          sprite.start[1] + (sprite.end[1] - sprite.start[1]) * value)
+            if sprite.fade is not None:
+                sprite.opacity = sprite.fade[0] + (sprite.fade[1] - sprite.fade[0]) * value
+            self.invalidate(*sprite.pos)
+            if progress < 1.0:
+                running.append(sprite)
+
+        if len(running) != len(self.sprites):
+            self.sprites = running
+            self._update_hidden()
+        if not self.sprites:
+            self.timer.stop()
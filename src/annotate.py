@@ -0,0 +1,192 @@
+# annotates every game of a pgn file with engine evaluations. the positions are distributed over several engine
+# processes and finished games are written to a checkpoint, so an interrupted run can be resumed
+#
+#   python annotate.py games.pgn -e Stockfish -o annotated.pgn --workers 4 --depth 18
+import argparse
+import json
+import os
+import sys
+import threading
+from queue import Queue
+
+import chess
+import chess.pgn
+
+from headless import add_engine_arguments, add_limit_arguments, limit_from_arguments, load_engine, set_io_backend, \
+    spawn, Progress
+
+# how often a position is tried again with a fresh engine if it could not be evaluated
+ANNOTATE_RETRIES = 2
+
+
+def format_eval(record, turn):
+    # formats the score of the record from the view of white like [%eval 0.35] or [%eval #-3]
+    sign = 1 if turn == chess.WHITE else -1
+    if record.score_mate is not None:
+        return f"[%eval #{record.score_mate * sign}]"
+    return f"[%eval {record.score_cp * sign / 100:.2f}]"
+
+
+def read_games(path):
+    games = []
+    with open(path, encoding='utf8', errors='replace') as handle:
+        while True:
+            game = chess.pgn.read_game(handle)
+            if game is None:
+                break
+            games.append(game)
+    return games
+
+
+def load_checkpoint(path):
+    # returns the comments of all games which have been finished before
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path) as handle:
+        return {int(key): value for key, value in json.load(handle)['games'].items()}
+
+
+def save_checkpoint(path, finished):
+    # writes to a temporary file first so an interruption never leaves a broken checkpoint behind
+    temp = path + '.tmp'
+    with open(temp, 'w') as handle:
+        json.dump({'games': finished}, handle)
+    os.replace(temp, path)
+
+
+class Annotator:
+
+    def __init__(self, engine, limit, workers, checkpoint=None, timeout=600, retries=ANNOTATE_RETRIES):
+        self.engine = engine
+        self.limit = limit
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.timeout = timeout
+        self.retries = retries
+
+        # game index -> list of comments, one per move
+        self.finished = load_checkpoint(checkpoint)
+        self._pending = {}
+        self._remaining = {}
+        # games with a position which could not be evaluated. they are not checkpointed so a resumed run repeats them
+        self.failed = set()
+        # the comments of those games for the positions which have been evaluated
+        self.incomplete = {}
+        self._lock = threading.Lock()
+
+    def run(self, games):
+        tasks = Queue()
+        for index, game in enumerate(games):
+            if index in self.finished:
+                continue
+            moves = [move.uci() for move in game.mainline_moves()]
+            if not moves:
+                self.finished[index] = []
+                continue
+
+            # one task for the position after each move. positions where the game is over have no evaluation
+            board = game.board()
+            root = board.fen()
+            self._pending[index] = [''] * len(moves)
+            self._remaining[index] = len(moves)
+            for ply, move in enumerate(game.mainline_moves()):
+                board.push(move)
+                if board.is_game_over():
+                    self._remaining[index] -= 1
+                    continue
+                # the side to move after the move, scores are given from its point of view
+                tasks.put((index, ply, root, moves[:ply + 1], board.turn))
+            if self._remaining[index] == 0:
+                self._finish(index, None, None)
+
+        self.progress = Progress(tasks.qsize())
+        threads = [threading.Thread(target=self._work, args=(tasks,), daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            tasks.put(None)
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.progress.report()
+        # the output also gets the evaluations of the games which have not been finished
+        return {**self.incomplete, **self.finished}
+
+    def _work(self, tasks):
+        engine = spawn(self.engine)
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            index, ply, root, moves, turn = task
+
+            comment = None
+            for attempt in range(self.retries + 1):
+                # restart the engine if it crashed, timed out or could not be started before
+                if engine is None or not engine.is_running:
+                    engine = spawn(self.engine)
+                if engine is None:
+                    continue
+                result = engine.search_wait(root, ' '.join(moves), self.limit, self.timeout)
+                if result is not None and result.info() is not None and result.info().has_score():
+                    comment = format_eval(result.info(), turn)
+                    break
+                # the engine may still be searching or be in a broken state, the next attempt uses a fresh one
+                engine.exit()
+                engine = None
+            self._finish(index, ply, comment)
+            self.progress.advance()
+
+        if engine is not None:
+            engine.exit()
+
+    def _finish(self, index, ply, comment):
+        # comment is None if the position could not be evaluated (ply is None if the game had nothing to evaluate)
+        with self._lock:
+            if ply is not None:
+                if comment is None:
+                    self.failed.add(index)
+                else:
+                    self._pending[index][ply] = comment
+                self._remaining[index] -= 1
+            if self._remaining[index] > 0:
+                return
+            comments = self._pending.pop(index)
+            # only games where every position has been evaluated are finished
+            if index in self.failed:
+                self.incomplete[index] = comments
+                return
+            self.finished[index] = comments
+            if self.checkpoint is not None:
+                save_checkpoint(self.checkpoint, self.finished)
+
+
+def write_games(path, games, finished):
+    with open(path, 'w', encoding='utf8') as handle:
+        for index, game in enumerate(games):
+            for node, comment in zip(game.mainline(), finished.get(index, [])):
+                if comment:
+                    node.comment = f"{comment} {node.comment}".strip()
+            print(game, file=handle, end="\n\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='annotates pgn games with engine evaluations')
+    parser.add_argument('pgn', help='the games to annotate')
+    parser.add_argument('-e', '--engine', required=True, help='name of the engine inside the configuration')
+    parser.add_argument('-o', '--output', required=True, help='the annotated pgn file')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='engine processes')
+    parser.add_argument('--checkpoint', help='file to resume from and to store finished games in')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds an engine may take for a position')
+    add_engine_arguments(parser)
+    add_limit_arguments(parser)
+    args = parser.parse_args()
+    set_io_backend(args)
+
+    games = read_games(args.pgn)
+    annotator = Annotator(load_engine(args.engine, args.engines), limit_from_arguments(args), args.workers,
+                          args.checkpoint, args.timeout)
+    write_games(args.output, games, annotator.run(games))
+    sys.stderr.write(f"annotated {len(annotator.finished)}/{len(games)} games, "
+                     f"{annotator.progress.rate():.1f} positions/s\n")
+    if annotator.failed:
+        sys.stderr.write(f"{len(annotator.failed)} games could not be evaluated completely and are not checkpointed\n")
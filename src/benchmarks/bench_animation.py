@@ -0,0 +1,78 @@
+# replays a game offscreen with a move every few milliseconds and reports how many frames the animation scheduler
+# drew, skipped and how many pieces it moved at most. the last row takes the game back and replays it in one step each
+#
+#   QT_QPA_PLATFORM=offscreen python benchmarks/bench_animation.py [frame budgets...]
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication(sys.argv[:1])
+
+from boardwidget import BoardWidget
+from animationscheduler import ANIMATION_DURATION, ANIMATION_FRAME_BUDGET
+
+GAME = ('e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7 f1e1 b7b5 a4b3 d7d6 c2c3 e8g8 h2h3 c6a5 b3c2 c7c5 d2d4 '
+        'd8c7 b1d2 c5d4 c3d4 a5c6 d2b3 a6a5 c1e3 a5a4 b3d2 c8d7 a1c1 c7b7 d2f1 f8c8 f1g3 c6b4 c2b1 c8c1 d1c1 a8c8 '
+        'c1d2 e5d4 f3d4 e7f8 a2a3 b4c6 d4c6 d7c6 e3d4 f6d7 g3f5 d7e5 d2g5 e5g6 h3h4 f7f6 g5g4 c6d7').split()
+
+
+def pump(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        app.processEvents()
+
+
+def replay(widget, interval):
+    # plays the game with the given time between moves and waits for the last transition
+    widget.set_fen(chess.STARTING_FEN)
+    start = time.perf_counter()
+    for uci in GAME:
+        widget.move_move(chess.Move.from_uci(uci))
+        pump(interval)
+    pump(ANIMATION_DURATION / 1000 + 0.05)
+    return time.perf_counter() - start
+
+
+def jumps(widget):
+    widget.undo_all()
+    pump(ANIMATION_DURATION / 1000 + 0.05)
+    widget.redo_all()
+    pump(ANIMATION_DURATION / 1000 + 0.05)
+
+
+if __name__ == '__main__':
+    budgets = [int(budget) for budget in sys.argv[1:]] or [ANIMATION_FRAME_BUDGET, 33]
+
+    print(f"{'budget':>7} {'interval':>9} {'moves':>6} {'transitions':>12} {'frames':>7} {'skipped':>8} "
+          f"{'frames/s':>9} {'peak':>5}")
+    for budget in budgets:
+        for interval in (0.1, 0.02, 0.005, 0.0):
+            widget = BoardWidget()
+            widget.resize(640, 640)
+            widget.show()
+            app.processEvents()
+            widget.animations.set_frame_budget(budget)
+
+            if interval > 0:
+                before = widget.animations.stats()
+                elapsed = replay(widget, interval)
+                label = f"{interval * 1000:.0f} ms"
+            else:
+                replay(widget, 0.0)
+                before = widget.animations.stats()
+                widget.animations.peak = 0
+                start = time.perf_counter()
+                jumps(widget)
+                elapsed = time.perf_counter() - start
+                label = 'all'
+            stats = {key: value - before[key] for key, value in widget.animations.stats().items()}
+            stats['peak'] = widget.animations.peak
+            print(f"{budget:>7} {label:>9} {stats['moves']:>6} {stats['transitions']:>12} {stats['frames']:>7} "
+                  f"{stats['skipped']:>8} {stats['frames'] / elapsed:>9.1f} {stats['peak']:>5}")
+            widget.close()
@@ -0,0 +1,98 @@
+# measures how many times per second BoardWidget.refresh_board can redraw a middlegame position offscreen. the old
+# refresh, which decoded and scaled the artwork of every piece on every call, is measured for comparison. stepping
+# through a game compares the refresh of the changed squares against a full refresh of the board
+#
+#   QT_QPA_PLATFORM=offscreen python benchmarks/bench_board_refresh.py [seconds]
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt
+
+app = QApplication(sys.argv[:1])
+
+from boardwidget import BoardWidget
+
+MIDDLEGAME = 'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 9'
+GAME = ('e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7 f1e1 b7b5 a4b3 d7d6 c2c3 e8g8 h2h3 c6a5 b3c2 c7c5 d2d4 '
+        'd8c7 b1d2 c5d4 c3d4 a5c6 d2b3 a6a5 c1e3 a5a4 b3d2 c8d7 a1c1 c7b7 d2f1 f8c8 f1g3 c6b4 c2b1 c8c1 d1c1 a8c8 '
+        'c1d2 e5d4 f3d4 e7f8 a2a3 b4c6 d4c6 d7c6 e3d4 f6d7 g3f5 d7e5 d2g5 e5g6 h3h4 f7f6 g5g4 c6d7').split()
+
+
+def legacy_refresh(widget):
+    # what refresh_board did before the pixmaps were cached: decode and scale every piece, then redraw the board
+    for square in chess.SQUARES:
+        piece = widget.board.piece_at(square)
+        if piece is None:
+            continue
+        QPixmap(widget._piece_path(piece)).scaled(widget.cellSize, widget.cellSize, Qt.KeepAspectRatio,
+                                                  Qt.SmoothTransformation)
+    widget.refresh_board(full=True)
+
+
+def step_through_game(widget, full):
+    # plays the game forward and back, refreshing after every move. returns moves per second
+    board = chess.Board()
+    moves = []
+    for uci in GAME:
+        move = chess.Move.from_uci(uci)
+        board.push(move)
+        moves.append(move)
+
+    start = time.perf_counter()
+    widget.board.reset()
+    widget.refresh_board(full=True)
+    for move in moves:
+        widget.board.push(move)
+        widget.refresh_board(full=full)
+        app.processEvents()
+    for move in moves:
+        widget.board.pop()
+        widget.refresh_board(full=full)
+        app.processEvents()
+    return 2 * len(moves) / (time.perf_counter() - start)
+
+
+def measure(refresh, widget, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        refresh(widget)
+        app.processEvents()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+
+    print(f"{'size':>6} {'before [1/s]':>14} {'after [1/s]':>13}")
+    for size in (400, 640, 960):
+        widget = BoardWidget()
+        widget.resize(size, size)
+        widget.show()
+        widget.board.set_fen(MIDDLEGAME)
+        app.processEvents()
+
+        before = measure(legacy_refresh, widget, seconds)
+        after = measure(BoardWidget.refresh_board, widget, seconds)
+        print(f"{size:>6} {before:>14.1f} {after:>13.1f}")
+        widget.close()
+
+    print(f"{'size':>6} {'full [moves/s]':>15} {'diff [moves/s]':>15}")
+    for size in (400, 640, 960):
+        widget = BoardWidget()
+        widget.resize(size, size)
+        widget.show()
+        app.processEvents()
+
+        full = max(step_through_game(widget, True) for _ in range(5))
+        diff = max(step_through_game(widget, False) for _ in range(5))
+        print(f"{size:>6} {full:>15.1f} {diff:>15.1f}")
+        widget.close()
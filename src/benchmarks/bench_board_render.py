@@ -0,0 +1,74 @@
+# measures the frames per second of the board offscreen: a full repaint, a move (push, refresh and paint of the
+# changed region) and an update of the engine arrows
+#
+#   QT_QPA_PLATFORM=offscreen python benchmarks/bench_board_render.py [seconds] [sizes...]
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication(sys.argv[:1])
+
+from boardwidget import BoardWidget, BoardArrow
+
+GAME = ('e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7 f1e1 b7b5 a4b3 d7d6 c2c3 e8g8 h2h3 c6a5 b3c2 c7c5 d2d4 '
+        'd8c7 b1d2 c5d4 c3d4 a5c6 d2b3 a6a5 c1e3 a5a4 b3d2 c8d7 a1c1 c7b7 d2f1 f8c8 f1g3 c6b4 c2b1 c8c1 d1c1 a8c8 '
+        'c1d2 e5d4 f3d4 e7f8 a2a3 b4c6 d4c6 d7c6 e3d4 f6d7 g3f5 d7e5 d2g5 e5g6 h3h4 f7f6 g5g4 c6d7').split()
+
+
+def frames(step, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        step(count)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def run(size, seconds):
+    widget = BoardWidget()
+    widget.resize(size, size)
+    widget.show()
+    moves = [chess.Move.from_uci(uci) for uci in GAME]
+    widget.arrows = [BoardArrow(0.3 - i * 0.05, move.from_square, move.to_square) for i, move in enumerate(moves[:3])]
+    app.processEvents()
+
+    def full(count):
+        widget.repaint()
+
+    def move(count):
+        # forward through the game and back again
+        index = count % (2 * len(moves))
+        if index < len(moves):
+            widget.board.push(moves[index])
+        else:
+            widget.board.pop()
+        widget.refresh_board()
+        app.processEvents()
+
+    def arrows(count):
+        move = moves[count % len(moves)]
+        widget.arrows[count % 3] = BoardArrow(0.3 - (count % 3) * 0.05, move.from_square, move.to_square)
+        widget.update_arrows()
+        app.processEvents()
+
+    widget.board.reset()
+    widget.refresh_board(full=True)
+    result = frames(full, seconds), frames(move, seconds), frames(arrows, seconds)
+    widget.close()
+    return result
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    sizes = [int(size) for size in sys.argv[2:]] or [400, 640, 960, 1280]
+
+    print(f"{'size':>6} {'full [fps]':>11} {'move [fps]':>11} {'arrows [fps]':>13}")
+    for size in sizes:
+        full, move, arrows = run(size, seconds)
+        print(f"{size:>6} {full:>11.1f} {move:>11.1f} {arrows:>13.1f}")
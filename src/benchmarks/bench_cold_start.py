@@ -0,0 +1,59 @@
+# measures how long it takes to get engines ready (start, options, isready) and to detect their options with an empty
+# and with a filled handshake cache
+#
+#   python benchmarks/bench_cold_start.py [engines] [engine binary]
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import handshakecache
+from engines import Engine
+from handshakecache import HandshakeCache
+
+FAKE_ENGINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fakeengine.py')
+
+
+def spawn_all(count, binary, cold):
+    # starts the engines one after another and waits for them to be ready afterwards, like a pool which is filled at
+    # once. with a filled cache start() sends the handshake and the options without waiting, so the engines boot next
+    # to each other and is_ready() only awaits the 'readyok' of the handshake
+    start = time.perf_counter()
+    engines = []
+    for i in range(count):
+        if cold:
+            handshakecache.handshake_cache().clear()
+        engine = Engine(bin=binary)
+        engine.start()
+        engine.send_options()
+        engines.append(engine)
+    for engine in engines:
+        engine.is_ready(timeout=10)
+    elapsed = time.perf_counter() - start
+    for engine in engines:
+        engine.exit()
+    return elapsed
+
+
+def detect_all(count, binary, cold):
+    start = time.perf_counter()
+    for i in range(count):
+        if cold:
+            handshakecache.handshake_cache().clear()
+        Engine(bin=binary).detect_options()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    binary = sys.argv[2] if len(sys.argv) > 2 else FAKE_ENGINE
+
+    with tempfile.TemporaryDirectory() as directory:
+        handshakecache._handshake_cache = HandshakeCache(os.path.join(directory, 'handshakes.json'))
+        print(f"{'':>16} {'cold [ms]':>10} {'cached [ms]':>12}")
+        for name, run in (('start engines', spawn_all), ('detect options', detect_all)):
+            cold = run(count, binary, True)
+            cached = run(count, binary, False)
+            print(f"{name:>16} {cold / count * 1000:>10.1f} {cached / count * 1000:>12.1f}")
@@ -0,0 +1,113 @@
+# compares the flat undo list the board used to keep against the game tree: taking back a whole game and replaying
+# it, and stepping through it move by move. the games are random legal games of the given lengths
+#
+#   python benchmarks/bench_game_tree.py [repetitions] [plies...]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+from gametree import GameTree
+
+
+def random_game(plies):
+    random.seed(plies)
+    board = chess.Board()
+    moves = []
+    while len(moves) < plies:
+        legal = list(board.legal_moves)
+        if not legal:
+            board.reset()
+            moves = []
+            continue
+        move = random.choice(legal)
+        board.push(move)
+        moves.append(move)
+    return moves
+
+
+class FlatMemory:
+    # the previous implementation: pop into the front of a list and push from it
+
+    def __init__(self, moves):
+        self.board = chess.Board()
+        self.move_memory = []
+        for move in moves:
+            self.board.push(move)
+
+    def undo_move(self):
+        if len(self.board.move_stack) > 0:
+            self.move_memory = [self.board.pop()] + self.move_memory
+
+    def undo_all(self):
+        while len(self.board.move_stack) > 0:
+            self.move_memory = [self.board.pop()] + self.move_memory
+
+    def redo_move(self):
+        if len(self.move_memory) > 0:
+            self.board.push(self.move_memory[0])
+            self.move_memory = self.move_memory[1:]
+
+    def redo_all(self):
+        while len(self.move_memory) > 0:
+            self.redo_move()
+
+
+class TreeMemory:
+    # the board widget: the cursor moves in the tree and the board with the game history follows it
+
+    def __init__(self, moves):
+        self.game = GameTree(chess.Board())
+        for move in moves:
+            self.game.play(move)
+        self.board = self.game.cursor.history_board()
+
+    def _step(self, step):
+        previous = self.game.cursor
+        step()
+        self.board = self.game.follow(self.board, previous)
+
+    def undo_move(self):
+        self._step(self.game.back)
+
+    def undo_all(self):
+        self._step(self.game.to_start)
+
+    def redo_move(self):
+        self._step(self.game.forward)
+
+    def redo_all(self):
+        self._step(self.game.to_end)
+
+
+def measure(memory, plies, repetitions):
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        memory.undo_all()
+        memory.redo_all()
+    jump = (time.perf_counter() - start) / repetitions * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for _ in range(plies):
+            memory.undo_move()
+        for _ in range(plies):
+            memory.redo_move()
+    step = (time.perf_counter() - start) / (repetitions * plies * 2) * 1e6
+    return jump, step
+
+
+if __name__ == '__main__':
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    lengths = [int(plies) for plies in sys.argv[2:]] or [80, 300, 1000]
+
+    print(f"{'plies':>6} {'memory':>7} {'undo+redo all [us]':>19} {'step [us]':>10}")
+    for plies in lengths:
+        moves = random_game(plies)
+        for name, memory in (('flat', FlatMemory(moves)), ('tree', TreeMemory(moves))):
+            jump, step = measure(memory, plies, repetitions)
+            print(f"{plies:>6} {name:>7} {jump:>19.1f} {step:>10.2f}")
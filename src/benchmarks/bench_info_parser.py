@@ -0,0 +1,58 @@
+# measures how many info lines per second the uci parser handles compared to the previous split/index lookups
+#
+#   python benchmarks/bench_info_parser.py [lines]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uciparser import parse_info
+
+LINES = [
+    "info depth 24 seldepth 33 multipv 1 score cp 31 wdl 92 866 42 nodes 8412388 nps 1402064 hashfull 412 tbhits 0 "
+    "time 6000 pv e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7 f1e1 b7b5 a4b3 d7d6 c2c3 e8g8",
+    "info depth 24 seldepth 31 multipv 2 score cp 24 upperbound nodes 8412388 nps 1402064 hashfull 412 tbhits 0 "
+    "time 6000 pv d2d4 g8f6 c2c4 e7e6 g1f3 d7d5 b1c3 f8e7",
+    "info depth 24 seldepth 29 multipv 3 score mate 12 nodes 8412388 nps 1402064 hashfull 412 tbhits 0 time 6000 "
+    "pv g1f3 d7d5 d2d4 g8f6",
+    "info depth 24 currmove e2e4 currmovenumber 1",
+]
+
+
+def legacy_parse(line):
+    # the lookups AnalyseWidget did for every line before the parser existed
+    if 'info' not in line:
+        return
+    func = lambda split, value: split[split.index(value) + 1] \
+        if value in split and len(split) > split.index(value) + 1 else None
+    split = line.lower().split()
+    result = [func(split, key) for key in ('nodes', 'nps', 'depth', 'seldepth', 'time', 'tbhits')]
+    if 'mate' in split and len(split) > split.index('mate') + 1:
+        result.append(split[split.index('mate') + 1])
+    elif 'score' in split and len(split) > split.index('score') + 2:
+        result.append(split[split.index('score') + 2])
+    if 'multipv' in split and split.index('multipv') + 1 < len(split):
+        result.append(int(split[split.index('multipv') + 1]) - 1)
+    if 'pv' not in split or split[-1] == 'pv':
+        return result
+    result.append(split[split.index('pv') + 1:])
+    return result
+
+
+def measure(func, lines):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    lines = [LINES[i % len(LINES)] for i in range(count)]
+
+    parser = measure(parse_info, lines)
+    legacy = measure(legacy_parse, lines)
+    print(f"parse_info   : {parser:12,.0f} lines/s")
+    print(f"split/index  : {legacy:12,.0f} lines/s")
+    print(f"speedup      : {parser / legacy:12.2f}x")
@@ -0,0 +1,54 @@
+# compares the cpu time the gui process spends reading engine output with a reader thread per engine against the
+# shared selector loop. every engine runs an infinite search on the scripted fake engine for a few seconds
+#
+#   python benchmarks/bench_io_backend.py [seconds] [engine counts...]
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines import Engine
+
+FAKE_ENGINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fakeengine.py')
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+def run(count, backend, seconds):
+    engines = []
+    for i in range(count):
+        engine = Engine(bin=FAKE_ENGINE)
+        engine.io_backend = backend
+        engine.start()
+        engine.send_line("setoption name MultiPV value 4")
+        engine.is_ready()
+        engines.append(engine)
+
+    threads = threading.active_count()
+    received = sum(engine.history.total for engine in engines)
+    cpu = time.process_time()
+    for engine in engines:
+        engine.search(START_FEN)
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu
+    received = sum(engine.history.total for engine in engines) - received
+
+    for engine in engines:
+        engine.exit()
+    return cpu, received, threads
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    counts = [int(count) for count in sys.argv[2:]] or [8, 32, 64]
+
+    # a fast and steady stream of info lines
+    os.environ.setdefault('FAKEENGINE_INFO_INTERVAL', '0.002')
+
+    print(f"{'engines':>8} {'backend':>9} {'threads':>8} {'lines/s':>10} {'cpu [%]':>8} {'cpu us/line':>12}")
+    for count in counts:
+        for backend in ('thread', 'selector'):
+            cpu, received, threads = run(count, backend, seconds)
+            print(f"{count:>8} {backend:>9} {threads:>8} {received / seconds:>10.0f} {cpu / seconds * 100:>8.1f} "
+                  f"{cpu / max(received, 1) * 1e6:>12.2f}")
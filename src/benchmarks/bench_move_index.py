@@ -0,0 +1,68 @@
+# compares resolving clicks by scanning the legal moves (as the board did before) against the move index. every
+# square of a few busy middlegame positions is clicked once, the index is built once per position
+#
+#   python benchmarks/bench_move_index.py [repetitions]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+from moveindex import MoveIndex
+
+POSITIONS = [
+    'r1bq1rk1/pp2bppp/2n1pn2/2pp4/2PP4/2N1PN2/PP2BPPP/R1BQ1RK1 w - - 0 8',
+    'r2q1rk1/1b1nbppp/p2ppn2/1p6/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 0 11',
+    'r1b2rk1/2q1bppp/p2ppn2/1pn5/3NPP2/P1N1B3/1PPQB1PP/R4RK1 w - - 0 13',
+    '1k1r3r/pp2qpp1/2np1n1p/2p1p3/2P1P1b1/2NP1NP1/PP2QPBP/R4RK1 b - - 0 14',
+]
+
+
+def scan(board, square):
+    # the filters the click handler used to run
+    sources = set(x.from_square + 64 * x.to_square for x in board.legal_moves if x.to_square == square)
+    moves = [x for x in board.legal_moves if x.from_square == square]
+    pairs = set(x.from_square + 64 * x.to_square for x in moves)
+    available = [x for x in board.legal_moves if x.from_square == square and x.to_square == square]
+    return len(sources), len(moves), len(pairs), len(available)
+
+
+def lookup(index, square):
+    sources = index.sources(square)
+    targets = index.targets(square)
+    available = index.moves(square, square)
+    return len(sources), len(targets), len(available)
+
+
+def measure(function, repetitions):
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) / (repetitions * len(POSITIONS) * 64) * 1e6
+
+
+if __name__ == '__main__':
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    boards = [chess.Board(fen) for fen in POSITIONS]
+
+    def scanned():
+        for board in boards:
+            for square in chess.SQUARES:
+                scan(board, square)
+
+    def indexed():
+        for board in boards:
+            index = MoveIndex(board)
+            for square in chess.SQUARES:
+                lookup(index, square)
+
+    def build():
+        for board in boards:
+            MoveIndex(board)
+
+    print(f"legal moves per position: {[board.legal_moves.count() for board in boards]}")
+    print(f"scan  [us/click] {measure(scanned, repetitions):8.2f}")
+    print(f"index [us/click] {measure(indexed, repetitions):8.2f}   (including one build per position)")
+    print(f"build [us/position] {measure(build, repetitions) * 64:8.2f}")
@@ -0,0 +1,54 @@
+# drags the board offscreen from one size to another, one pixel step per frame, and measures the frames per second
+# and the smooth rescales. compares rescaling smoothly on every resize event against scaling quickly while the size
+# changes and smoothly once it settled
+#
+#   QT_QPA_PLATFORM=offscreen python benchmarks/bench_resize.py [steps] [from] [to]
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication(sys.argv[:1])
+
+from boardwidget import BoardWidget, RESIZE_SETTLE_DELAY
+
+
+def drag(widget, sizes):
+    start = time.perf_counter()
+    for size in sizes:
+        widget.resize(size, size)
+        widget.repaint()
+        app.processEvents()
+    elapsed = time.perf_counter() - start
+
+    # wait for the final rescale
+    end = time.perf_counter() + 2 * RESIZE_SETTLE_DELAY / 1000
+    while time.perf_counter() < end:
+        app.processEvents()
+        time.sleep(0.005)
+    return elapsed
+
+
+if __name__ == '__main__':
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    first = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    last = int(sys.argv[3]) if len(sys.argv) > 3 else 1100
+    sizes = [first + (last - first) * i // steps for i in range(1, steps + 1)]
+
+    print(f"{'mode':>9} {'frames/s':>9} {'resizes':>8} {'rescales':>9}")
+    for mode, delay in (('smooth', 0), ('settled', RESIZE_SETTLE_DELAY)):
+        widget = BoardWidget()
+        widget.resize(first, first)
+        widget.show()
+        app.processEvents()
+        widget.resize_timer.setInterval(delay)
+        widget.resizes = widget.rescales = 0
+
+        elapsed = drag(widget, sizes)
+        stats = widget.resize_stats()
+        print(f"{mode:>9} {len(sizes) / elapsed:>9.1f} {stats['resizes']:>8} {stats['rescales']:>9}")
+        widget.close()
@@ -0,0 +1,43 @@
+# measures the round trip of Engine.stop_search (stop -> isready -> readyok) against the scripted fake engine
+#
+#   python benchmarks/bench_stop_latency.py [iterations] [engine binary]
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines import Engine
+
+FAKE_ENGINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fakeengine.py')
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+def run(iterations, binary):
+    engine = Engine(bin=binary)
+    if not engine.start():
+        print(f"could not start {binary}")
+        return
+
+    latencies = []
+    for i in range(iterations):
+        engine.search(START_FEN)
+        # let the engine produce some output before stopping it
+        time.sleep(0.005)
+        start = time.perf_counter()
+        engine.stop_search()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    engine.exit()
+
+    latencies.sort()
+    print(f"iterations : {iterations}")
+    print(f"mean       : {statistics.mean(latencies):8.3f} ms")
+    print(f"median     : {statistics.median(latencies):8.3f} ms")
+    print(f"p95        : {latencies[int(len(latencies) * 0.95) - 1]:8.3f} ms")
+    print(f"max        : {latencies[-1]:8.3f} ms")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200, sys.argv[2] if len(sys.argv) > 2 else FAKE_ENGINE)
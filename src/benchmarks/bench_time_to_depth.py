@@ -0,0 +1,61 @@
+# compares the time to reach a fixed depth on consecutive moves of a game when the engine receives a bare fen for
+# every move (previous behaviour) and when it receives the root fen with the game history (current behaviour).
+# the fake engine has no hash, so this needs a real engine to show a difference. each run starts its own engine
+# process, so neither starts with the hash the other one filled
+#
+#   python benchmarks/bench_time_to_depth.py <engine binary> [depth]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+from engines import Engine
+
+GAME = "e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7 f1e1 b7b5 a4b3 d7d6 c2c3 e8g8 h2h3 c6a5 b3c2 c7c5 " \
+       "d2d4 d8c7 b1d2 c5d4 c3d4 a5c6 d2b3 a6a5 c1e3 a5a4".split()
+
+
+def run(binary, depth, with_history):
+    engine = Engine(bin=binary)
+    if not engine.start():
+        print(f"could not start {binary}")
+        sys.exit(1)
+    engine.is_ready()
+
+    board = chess.Board()
+    root = board.fen()
+    times = []
+    for move in GAME:
+        board.push_uci(move)
+        if with_history:
+            # what Engine.search sends for the game history. the root never changes so no ucinewgame is sent
+            position = f"position fen {root} moves {' '.join(m.uci() for m in board.move_stack)}"
+        else:
+            position = f"position fen {board.fen()}"
+
+        start = time.perf_counter()
+        if engine.send_and_wait('bestmove', position, f"go depth {depth}", timeout=600) is None:
+            print("engine did not answer")
+            sys.exit(1)
+        times.append(time.perf_counter() - start)
+
+    engine.exit()
+    return times
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("usage: bench_time_to_depth.py <engine binary> [depth]")
+        sys.exit(1)
+    binary = sys.argv[1]
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    fen_times = run(binary, depth, with_history=False)
+    history_times = run(binary, depth, with_history=True)
+
+    print(f"{'ply':>4} {'fen [ms]':>10} {'moves [ms]':>12}")
+    for ply, (a, b) in enumerate(zip(fen_times, history_times), 1):
+        print(f"{ply:>4} {a * 1000:10.1f} {b * 1000:12.1f}")
+    print(f"{'sum':>4} {sum(fen_times) * 1000:10.1f} {sum(history_times) * 1000:12.1f}")
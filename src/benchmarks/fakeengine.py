@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# a scripted uci engine used by the benchmarks. it does not play chess well, it only speaks the protocol with a
+# configurable output rate. it is configured through environment variables since Engine.start only passes the binary
+#
+#   FAKEENGINE_INFO_INTERVAL    seconds between two depths (default 0.001)
+#   FAKEENGINE_NODES_PER_DEPTH  nodes reported per depth (default 10000)
+#   FAKEENGINE_STARTUP_DELAY    seconds to sleep before answering 'uci' (default 0)
+import os
+import sys
+import threading
+import time
+import random
+
+import chess
+
+INFO_INTERVAL = float(os.environ.get('FAKEENGINE_INFO_INTERVAL', '0.001'))
+NODES_PER_DEPTH = int(os.environ.get('FAKEENGINE_NODES_PER_DEPTH', '10000'))
+STARTUP_DELAY = float(os.environ.get('FAKEENGINE_STARTUP_DELAY', '0'))
+
+out_lock = threading.Lock()
+
+
+def send(line):
+    with out_lock:
+        sys.stdout.write(line + '\n')
+        sys.stdout.flush()
+
+
+class Search(threading.Thread):
+
+    def __init__(self, board, limits, multipv):
+        threading.Thread.__init__(self, daemon=True)
+        self.board = board
+        self.limits = limits
+        self.multipv = multipv
+        self.stopped = threading.Event()
+
+    def _movetime(self):
+        # derive a time budget in seconds from the limits
+        if 'movetime' in self.limits:
+            return self.limits['movetime'] / 1000
+        side = 'wtime' if self.board.turn == chess.WHITE else 'btime'
+        inc = 'winc' if self.board.turn == chess.WHITE else 'binc'
+        if side in self.limits:
+            return (self.limits[side] / 40 + self.limits.get(inc, 0) * 0.5) / 1000
+        return None
+
+    def run(self):
+        start = time.perf_counter()
+        movetime = self._movetime()
+        moves = sorted(self.board.legal_moves, key=lambda m: m.uci())
+        rng = random.Random(self.board.fen())
+        rng.shuffle(moves)
+        nodes = 0
+        depth = 0
+        best = moves[0] if moves else None
+
+        while moves and not self.stopped.is_set():
+            depth += 1
+            nodes += NODES_PER_DEPTH
+            elapsed = time.perf_counter() - start
+            for i in range(min(self.multipv, len(moves))):
+                score = rng.randint(-60, 60)
+                send(f"info depth {depth} seldepth {depth + 4} multipv {i + 1} score cp {score} nodes {nodes} "
+                     f"nps {int(nodes / max(elapsed, 1e-6))} hashfull {min(depth * 10, 1000)} tbhits 0 "
+                     f"time {int(elapsed * 1000)} pv {moves[i].uci()}")
+            send(f"info depth {depth} currmove {best.uci()} currmovenumber 1")
+
+            if 'depth' in self.limits and depth >= self.limits['depth']:
+                break
+            if 'nodes' in self.limits and nodes >= self.limits['nodes']:
+                break
+            if movetime is not None and time.perf_counter() - start >= movetime:
+                break
+            self.stopped.wait(INFO_INTERVAL)
+
+        # an infinite search only returns once it has been stopped
+        if self.limits.get('infinite'):
+            self.stopped.wait()
+        send(f"bestmove {best.uci() if best else '0000'}")
+
+
+def parse_limits(split):
+    limits = {}
+    i = 1
+    while i < len(split):
+        if split[i] == 'infinite':
+            limits['infinite'] = True
+        elif i + 1 < len(split):
+            limits[split[i]] = int(split[i + 1])
+            i += 1
+        i += 1
+    return limits
+
+
+def main():
+    board = chess.Board()
+    search = None
+    multipv = 1
+
+    for line in sys.stdin:
+        split = line.split()
+        if not split:
+            continue
+        command = split[0]
+
+        if command == 'uci':
+            time.sleep(STARTUP_DELAY)
+            send('id name FakeEngine 1.0')
+            send('id author ChessGUI')
+            send('option name Hash type spin default 16 min 1 max 65536')
+            send('option name Threads type spin default 1 min 1 max 512')
+            send('option name MultiPV type spin default 1 min 1 max 500')
+            send('uciok')
+        elif command == 'isready':
+            send('readyok')
+        elif command == 'setoption' and 'MultiPV' in split and 'value' in split:
+            multipv = int(split[split.index('value') + 1])
+        elif command == 'ucinewgame':
+            board = chess.Board()
+        elif command == 'position':
+            if split[1] == 'startpos':
+                board = chess.Board()
+            else:
+                end = split.index('moves') if 'moves' in split else len(split)
+                board = chess.Board(' '.join(split[2:end]))
+            if 'moves' in split:
+                for move in split[split.index('moves') + 1:]:
+                    board.push_uci(move)
+        elif command == 'go':
+            search = Search(board.copy(), parse_limits(split), multipv)
+            search.start()
+        elif command == 'stop':
+            # bestmove must be sent before anything which follows the stop command
+            if search is not None:
+                search.stopped.set()
+                search.join()
+                search = None
+        elif command in ('quit', 'exit'):
+            break
+
+
+if __name__ == '__main__':
+    main()
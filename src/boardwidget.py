@@ -1,11 +1,19 @@
 import math
 
-from PyQt5.QtWidgets import QWidget, QLabel, QSizePolicy, QDialog, QGridLayout, QPushButton
-from PyQt5.QtGui import QColor, QPixmap, QIcon, QColor, QBrush, QPainter, QPen, QPolygon
-from PyQt5.QtCore import Qt, QPropertyAnimation, QRect, QPoint, QSize, QEasingCurve
+from PyQt5.QtWidgets import QWidget, QSizePolicy, QDialog, QGridLayout, QPushButton
+from PyQt5.QtGui import QColor, QIcon, QBrush, QPainter, QPen, QPolygonF
+from PyQt5.QtCore import Qt, QTimer, QRect, QRectF, QPointF, QSize
 import chess
 import res
-import time
+
+from renderassets import RenderAssets, piece_path
+from moveindex import MoveIndex
+from gametree import GameTree
+from animationscheduler import AnimationScheduler
+
+# the pieces are scaled smoothly once the size did not change for this long (in milliseconds). until then they are
+# scaled quickly so resizing the window stays fluent
+RESIZE_SETTLE_DELAY = 150
 
 class BoardArrow:
     width = 30
@@ -25,24 +33,63 @@ class BoardWidget(QWidget):
     def _config(self):
         self.cellSize  = self.width() // 8
         self.board     = chess.Board()
-        self.arrow_panel = QLabel(self)
-        self.boardPixmap = QPixmap(":/boards/images/board.png")
+        # scaled pieces and board for the current size
+        self.assets = RenderAssets()
+        # whether the pieces and board are drawn with the smoothly scaled artwork. not the case while resizing
+        self.smooth = True
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_SETTLE_DELAY)
+        self.resize_timer.timeout.connect(self._settle_size)
+        # resize events and the smooth rescales they caused
+        self.resizes = 0
+        self.rescales = 0
+        # the pieces which are drawn and the cell size and pixel ratio they have been drawn with
+        self.rendered = {}
+        self.rendered_size = None
+        # moves the pieces between two positions. their squares are not drawn while they move
+        self.animations = AnimationScheduler(self._update_cell, parent=self)
+        # the area covered by the arrows when they were drawn the last time
+        self.arrow_rect = QRect()
         self.clickedAt = None
-        self._create_pieces()
+        # the legal moves of the current position. built on the first click after the position changed
+        self.move_index = None
         self.listener  = None
         self.piece_type_placing = None
-        self.move_memory = []
+        # the moves played on this board including the lines which have been taken back. the tree keeps its own
+        # boards, self.board is a copy of the position of the cursor with the whole game on its move stack and is
+        # replaced when the cursor moves
+        self.game = GameTree(self.board)
         self.arrows      = []
         self.refresh_board()
 
-        self.paintEvent             = lambda e : self._paint_background()
-        self.arrow_panel.paintEvent = lambda e : self._paint_arrows()
-
     def resizeEvent(self, e):
         x, y = e.size().height(), e.size().width()
-        self.cellSize = min(x, y) / 8
+        self.cellSize = min(x, y) // 8
+        self.resizes += 1
+        # a hidden board (e.g. when the window is created) is scaled smoothly right away, a visible one only once the
+        # user stopped resizing it
+        if not self.isVisible() or self.resize_timer.interval() <= 0:
+            self._settle_size()
+            return
+        self.smooth = False
+        self.assets.invalidate(self.cellSize, self.devicePixelRatioF())
+        self.refresh_board()
+        self.resize_timer.start()
+
+    def _settle_size(self):
+        # scale the pieces once for the new size and forget the old ones
+        self.resize_timer.stop()
+        self.smooth = True
+        self.rescales += 1
+        self.assets.invalidate(self.cellSize, self.devicePixelRatioF())
+        self.assets.warm(self.cellSize, self.devicePixelRatioF())
+        # repaints with the smooth pieces without stopping a running animation
         self.refresh_board()
-        self.arrow_panel.resize(self.width(), self.height())
+        self.update()
+
+    def resize_stats(self):
+        return {'resizes': self.resizes, 'rescales': self.rescales}
 
     def _get_index(self, square):
         return square // 8, square % 8
@@ -58,34 +105,59 @@ class BoardWidget(QWidget):
         return 'w' if piece.color == chess.WHITE else 'b'
        
     def _piece_path(self, piece):
-        return f'://pieces//images//{self._get_color_label(piece) + piece.symbol().lower()}.png'
-
-    def _paint_background(self):
-        painter = QPainter(self)
-        painter.drawPixmap(self.rect(), self.boardPixmap)
+        return piece_path(piece)
 
-    def _paint_arrows(self):
+    def _square_rect(self, square):
+        x, y = self._get_coordinate(square)
+        return QRect(int(x), int(y), int(self.cellSize), int(self.cellSize))
 
-        def transform(x, y, r, x0, y0):
-            return QPoint(x0 + math.cos(r) * x - math.sin(r) * y, y0 + math.sin(r) * x + math.cos(r) * y)
-
-        self.arrow_panel.setStyleSheet("background-color:transparent")
-        self.arrow_panel.raise_()
+    def _cell_rect(self, column, row):
+        # the area of a (possibly fractional) cell, column and row are counted from the top left
+        return QRectF(column * self.cellSize, row * self.cellSize, self.cellSize, self.cellSize)
 
-        painter = QPainter(self.arrow_panel)
-        # drawing the arrows
+    def _update_cell(self, column, row):
+        self.update(self._cell_rect(column, row).toAlignedRect())
 
-        # setting the brush for arrows
-        brush = QBrush(QColor(100, 100, 100, 200))
-        painter.setBrush(brush)
-
-        # enable antialising
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        # remove the border
-        painter.setPen(QPen(QColor(0,0,0,0)))
+    def paintEvent(self, e):
+        # draws the board, the pieces, the selection and the arrows. only the invalidated region is drawn
+        painter = QPainter(self)
+        region = e.rect()
+
+        # the board is scaled to the widget, so the part of it which is repainted is the same part of the pixmap
+        board = self.assets.board(self.width(), self.height(), self.devicePixelRatioF(), self.smooth)
+        ratio = board.devicePixelRatio()
+        painter.drawPixmap(QRectF(region), board, QRectF(region.x() * ratio, region.y() * ratio,
+                                                         region.width() * ratio, region.height() * ratio))
+
+        ratio = self.devicePixelRatioF()
+        hidden = self.animations.hidden
+        for square, piece in self.rendered.items():
+            if square in hidden:
+                continue
+            rect = self._square_rect(square)
+            if rect.intersects(region):
+                painter.drawPixmap(rect.topLeft(), self.assets.piece(piece, self.cellSize, ratio, self.smooth))
+        for sprite in self.animations.sprites:
+            rect = self._cell_rect(*sprite.pos)
+            if rect.intersects(QRectF(region)):
+                painter.setOpacity(sprite.opacity)
+                painter.drawPixmap(rect.topLeft(), self.assets.piece(sprite.piece, self.cellSize, ratio, self.smooth))
+        painter.setOpacity(1.0)
+
+        if self.clickedAt is not None:
+            painter.setPen(QPen(QColor('gray'), 5))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRoundedRect(QRectF(self._square_rect(self.clickedAt)).adjusted(2.5, 2.5, -2.5, -2.5), 5, 5)
+
+        if self.arrow_rect.intersects(region):
+            self._paint_arrows(painter)
+
+    def _arrow_polygons(self):
 
+        def transform(x, y, r, x0, y0):
+            return QPointF(x0 + math.cos(r) * x - math.sin(r) * y, y0 + math.sin(r) * x + math.cos(r) * y)
 
+        polygons = []
         for arrow in self.arrows:
             if arrow.width <= 0:
                 continue
@@ -103,7 +175,7 @@ class BoardWidget(QWidget):
             y0 = y_from + self.cellSize // 2
 
             # draw an arrow. first create a polygon which will receive some points
-            polygon = QPolygon()
+            polygon = QPolygonF()
             polygon.append(transform( width             / 2, 0                              ,angle,x0,y0))
             polygon.append(transform( width             / 2, distance - arrow_head_length   ,angle,x0,y0))
             polygon.append(transform( arrow_head_width  / 2, distance - arrow_head_length   ,angle,x0,y0))
@@ -111,37 +183,62 @@ class BoardWidget(QWidget):
             polygon.append(transform(-arrow_head_width  / 2, distance - arrow_head_length   ,angle,x0,y0))
             polygon.append(transform(-width             / 2, distance - arrow_head_length   ,angle,x0,y0))
             polygon.append(transform(-width             / 2, 0                              ,angle,x0,y0))
+            polygons.append(polygon)
+        return polygons
 
-            painter.drawPolygon(polygon)
-
-    def _create_pieces(self):
-        self.pieces = []
-        for square in range(64):
-            x, y = self._get_coordinate(square)
-            label = QLabel(self)
-            label.move(x,y)
-            label.setAlignment(Qt.AlignCenter)
-            label.setStyleSheet("background-color:transparent;")
-            self.pieces.append(label)
-
-    def refresh_board(self):
-        for square in chess.SQUARES:
-            piece = self.board.piece_at(square)
-
-
+    def _paint_arrows(self, painter):
+        # setting the brush for arrows
+        brush = QBrush(QColor(100, 100, 100, 200))
+        painter.setBrush(brush)
 
-            x, y  = self._get_coordinate(square)
+        # enable antialising
+        painter.setRenderHint(QPainter.Antialiasing)
 
-            self.pieces[square].move(x, y)
-            self.pieces[square].resize(self.cellSize, self.cellSize)
+        # remove the border
+        painter.setPen(QPen(QColor(0,0,0,0)))
 
-            if piece is None:
-                self.pieces[square].clear()
-                continue
+        for polygon in self._arrow_polygons():
+            painter.drawPolygon(polygon)
 
-            self.pieces[square].setPixmap(
-                QPixmap(self._piece_path(piece)).scaled(self.cellSize, self.cellSize, Qt.KeepAspectRatio,
-                                                        Qt.SmoothTransformation))
+    def update_arrows(self):
+        # repaints the area the arrows covered before and the area they cover now
+        rect = QRect()
+        for polygon in self._arrow_polygons():
+            rect = rect.united(polygon.boundingRect().toAlignedRect().adjusted(-1, -1, 1, 1))
+        self.update(self.arrow_rect.united(rect))
+        self.arrow_rect = rect
+
+    def refresh_board(self, full=False):
+        # only the squares which changed since the last refresh are repainted. everything is repainted if the size
+        # changed or a full refresh is requested (e.g. after loading a fen). the pieces are animated in cells, so a
+        # new size keeps them moving while a full refresh puts them on their squares
+        size = (self.cellSize, self.devicePixelRatioF())
+        pieces = self.board.piece_map()
+        if full:
+            self._finish_animation()
+        if full or size != self.rendered_size:
+            self.rendered = pieces
+            self.rendered_size = size
+            self.update_arrows()
+            self.update()
+            return
+
+        for square in set(pieces) | set(self.rendered):
+            if pieces.get(square) != self.rendered.get(square):
+                self.update(self._square_rect(square))
+        self.rendered = pieces
+
+    def set_fen(self, fen):
+        # loads a position as the root of a new game. raises a ValueError if the fen is invalid
+        self.board.set_fen(fen)
+        self.move_index = None
+        self.game = GameTree(self.board)
+        self.refresh_board(full=True)
+
+    def legal_moves(self):
+        if self.move_index is None:
+            self.move_index = MoveIndex(self.board)
+        return self.move_index
 
     def set_piece_placed(self, piece_type=None):
         self.piece_type_placing = piece_type
@@ -159,70 +256,72 @@ class BoardWidget(QWidget):
                 elif e.button() == Qt.RightButton:
                     self.board.set_piece_at(square, chess.Piece(self.piece_type_placing, chess.BLACK))
 
+            # the edited position is the root of a new game
+            self.board.clear_stack()
+            self.move_index = None
+            self.game = GameTree(self.board)
+
             self.notify_listener()
             self.refresh_board()
 
         # for normal move recognition
         elif e.button() == Qt.LeftButton:
             square = self._get_square(e.x(), e.y())
+            index  = self.legal_moves()
             if self.clickedAt is None:
                 # check if there is only a single valid move to this specific square (does consider promotions)
-                if len(set(x.from_square + 64 * x.to_square for x in self.board.legal_moves if x.to_square == square)) == 1:
-                    move = [x for x in self.board.legal_moves if x.to_square == square][0]
-                    self.move_from_to(move.from_square, move.to_square)
+                sources = index.sources(square)
+                if len(sources) == 1:
+                    self.move_from_to(sources[0], square)
                     self.notify_listener()
                     return
                 # if there are multiple moves, select it and choose the piece next
-                if len(set(x.from_square + 64 * x.to_square for x in self.board.legal_moves if
-                           x.to_square == square)) >= 1:
-                    self.clickedAt = square
-                    self.pieces[self.clickedAt].setStyleSheet(
-                        'border: 5px solid gray; border-radius:5px; background-color:transparent;')
+                if len(sources) > 1:
+                    self._select(square)
                     return
 
                 # dont select a square where the is an opponent piece
                 if self.board.piece_at(square) is not None and self.board.turn != self.board.piece_at(square).color:
                     return
 
-                # get the moves from that square
-                moves           = [x for x in self.board.legal_moves if x.from_square == square]
+                # get the squares the piece can move to
+                targets = index.targets(square)
 
                 # if there is no legal move, do not select it
-                if len(moves) == 0:
+                if len(targets) == 0:
                     return
 
-                # if there is only a single move, do it
-                if len(moves) == 1:
-                    self.move_move(moves[0])
-                    self.notify_listener()
-                    return
-
-                # if there are multiple promotions, still do the move and request the promo piece
-                if len(set(x.from_square + 64 * x.to_square for x in moves if x.from_square == square)) == 1:
-                    self.move_from_to(moves[0].from_square, moves[0].to_square)
+                # if there is only a single target, do the move and request the promo piece if it promotes
+                if len(targets) == 1:
+                    self.move_from_to(square, targets[0])
                     self.notify_listener()
                     return
 
                 # otherwise select the square
-                self.clickedAt = square
-                self.pieces[self.clickedAt].setStyleSheet(
-                    'border: 5px solid gray; border-radius:5px; background-color:transparent;')
+                self._select(square)
                 return
             else:
 
-                self.pieces[self.clickedAt].setStyleSheet('border: 0px; background-color:transparent;')
-                if self.clickedAt == square:
-                    self.clickedAt = None
+                clicked = self.clickedAt
+                self._select(None)
+                if clicked == square:
                     return
 
                 # check if the select square is a from or to square
-                if self.board.piece_at(self.clickedAt) is None or self.board.piece_at(self.clickedAt).color != self.board.turn:
-                    if self.move_from_to(square, self.clickedAt):
+                if self.board.piece_at(clicked) is None or self.board.piece_at(clicked).color != self.board.turn:
+                    if self.move_from_to(square, clicked):
                         self.notify_listener()
                 else:
-                    if self.move_from_to(self.clickedAt, square):
+                    if self.move_from_to(clicked, square):
                         self.notify_listener()
-                self.clickedAt = None
+
+    def _select(self, square):
+        # highlights the square (nothing if None)
+        if self.clickedAt is not None:
+            self.update(self._square_rect(self.clickedAt))
+        self.clickedAt = square
+        if square is not None:
+            self.update(self._square_rect(square))
 
     def show_promotion_dialog(self):
         # creates a promotion dialog to select a piece and return that
@@ -287,70 +386,79 @@ class BoardWidget(QWidget):
         return promotionPiece
 
     def move_from_to(self, sq_from, sq_to):
-        available_moves = [x for x in self.board.legal_moves if x.from_square == sq_from and x.to_square == sq_to]
+        available_moves = self.legal_moves().moves(sq_from, sq_to)
 
-        if len(available_moves) > 1:
-            promo_piece = self.show_promotion_dialog() + 2
-            for k in available_moves:
-                if k.promotion == promo_piece:
-                    available_moves[0] = k
-            # handle promotion
         if len(available_moves) < 1:
             # no legal move
             return False
 
-        move = available_moves[0]
+        # handle promotion
+        if len(available_moves) > 1:
+            move = self.legal_moves().promotion(sq_from, sq_to, self.show_promotion_dialog() + 2)
+        else:
+            move = available_moves[0]
         return self.move_move(move)
 
     def move_move(self, move):
-        if move not in self.board.legal_moves:
+        if move not in self.legal_moves():
             return False
 
-        self.board.push(move)
+        previous = self.game.cursor
+        self.game.play(move)
+        self._show_cursor(previous)
+        return True
 
-        x_from,y_from = self._get_coordinate(move.from_square)
-        x_to  ,y_to   = self._get_coordinate(move.to_square)
+    def _finish_animation(self):
+        # draws the moving pieces on their squares right away
+        self.animations.finish()
 
+    def _show_cursor(self, previous=None):
+        # a single step pushes or pops the move on the board of the widget, other jumps rebuild it. the moves between
+        # the previous node and the cursor are animated as one transition if one of them follows the other
+        self.board = self.game.follow(self.board, previous)
+        self.move_index = None
         self.refresh_board()
-        label = self.pieces[move.to_square]
-        self.anim = QPropertyAnimation(label, b"pos")
-        self.anim.setDuration(400)
-        self.anim.setStartValue(QPoint(x_from, y_from))
-        self.anim.setEndValue(QPoint(x_to, y_to))
-        self.anim.setEasingCurve(QEasingCurve.InOutQuart)
-        self.anim.start()
-        # self.anim.finished.connect(self.notify_listener)
-
-        self.move_memory = []
-        return True
+        if previous is None:
+            return
+        cursor = self.game.cursor
+        if cursor.ply > previous.ply:
+            moves = cursor.moves(previous)
+            if moves is not None:
+                self.animations.transition(previous.board(), moves)
+        elif cursor.ply < previous.ply:
+            moves = previous.moves(cursor)
+            if moves is not None:
+                self.animations.transition(cursor.board(), moves, backward=True)
 
     def undo_move(self):
-        if len(self.board.move_stack) > 0:
-            self.move_memory = [self.board.pop()] + self.move_memory
-        self.refresh_board()
+        previous = self.game.cursor
+        if self.game.back():
+            self._show_cursor(previous)
         self.notify_listener()
 
     def undo_all(self):
-
-        while len(self.board.move_stack) > 0:
-            self.move_memory = [self.board.pop()] + self.move_memory
-
-        self.board.clear_stack()
-        self.refresh_board()
+        previous = self.game.cursor
+        self.game.to_start()
+        self._show_cursor(previous)
         self.notify_listener()
 
-    def redo_move(self, refresh=True):
-        if len(self.move_memory) > 0:
-            self.board.push(self.move_memory[0])
-            self.move_memory = self.move_memory[1:]
-        if refresh:
-            self.refresh_board()
-            self.notify_listener()
+    def redo_move(self):
+        previous = self.game.cursor
+        if self.game.forward():
+            self._show_cursor(previous)
+        self.notify_listener()
 
     def redo_all(self):
-        while len(self.move_memory) > 0:
-            self.redo_move(refresh=False)
-        self.refresh_board()
+        previous = self.game.cursor
+        self.game.to_end()
+        self._show_cursor(previous)
+        self.notify_listener()
+
+    def jump_to(self, node):
+        # shows any position of the game without replaying the moves to it
+        previous = self.game.cursor
+        self.game.jump_to(node)
+        self._show_cursor(previous)
         self.notify_listener()
 
     def notify_listener(self):
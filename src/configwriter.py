@@ -0,0 +1,87 @@
+import logging
+import threading
+import time
+
+from engines import ENGINES_XML, Engines
+
+# changes within this many seconds after the first one are written together
+CONFIG_WRITE_DELAY = 0.5
+
+log = logging.getLogger(__name__)
+
+
+class ConfigWriter:
+
+    def __init__(self, engines, path=ENGINES_XML, delay=CONFIG_WRITE_DELAY):
+        # writes the engine configuration on a background thread. the gui only marks it dirty, the writer waits for
+        # the delay so a dragged slider causes one write instead of one per step
+        self.engines = engines
+        self.path = path
+        self.delay = delay
+
+        self.marks = 0
+        self.writes = 0
+
+        # the newest snapshot which has not been written yet and the time it has to be written at the latest
+        self._pending = None
+        self._deadline = None
+        self._writing = False
+        self._flushing = False
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def mark_dirty(self):
+        # called by the gui after each change. copying the settings is cheap, serialising them is not
+        snapshot = self.engines.snapshot()
+        with self._condition:
+            self.marks += 1
+            if self._pending is None:
+                self._deadline = time.monotonic() + self.delay
+            self._pending = snapshot
+            self._condition.notify_all()
+
+    def flush(self):
+        # blocks until the newest snapshot has been written
+        with self._condition:
+            self._flushing = True
+            self._condition.notify_all()
+            while (self._pending is not None or self._writing) and self._writer.is_alive():
+                self._condition.wait()
+            self._flushing = False
+
+    def close(self):
+        # writes the pending changes and stops the writer. used when the program exits
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join()
+
+    def stats(self):
+        return {'marks': self.marks, 'writes': self.writes}
+
+    def _write_loop(self):
+        while True:
+            with self._condition:
+                # wait for a change and for the end of its delay unless someone waits for it to be written
+                while not self._closed and (self._pending is None or
+                                            not self._flushing and time.monotonic() < self._deadline):
+                    timeout = None if self._pending is None else self._deadline - time.monotonic()
+                    self._condition.wait(timeout)
+                if self._pending is None:
+                    return
+                snapshot, self._pending = self._pending, None
+                self._writing = True
+
+            try:
+                Engines.dump_xml(snapshot, self.path)
+            except OSError as error:
+                log.warning("could not write %s: %s", self.path, error)
+
+            with self._condition:
+                self._writing = False
+                self.writes += 1
+                self._condition.notify_all()
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+from uciparser import InfoRecord
+
+# the default amount of updates per second the gui receives
+BRIDGE_FRAME_RATE = 20
+
+
+# the fields describing the line of a record. records which only carry statistics (nodes, nps, hashfull, ...) do not
+# have them
+_LINE_FIELDS = ('depth', 'seldepth', 'score_cp', 'score_mate', 'bound', 'wdl', 'pv')
+
+
+def _merge(pending, record):
+    # a record without pv and score must not drop the line of the record it replaces. the records are shared with the
+    # caches, so a new one is created instead of changing either
+    if record.pv is not None or record.has_score() or (pending.pv is None and not pending.has_score()):
+        return record
+    merged = InfoRecord()
+    for key in InfoRecord.__slots__:
+        setattr(merged, key, getattr(record, key))
+    for key in _LINE_FIELDS:
+        if getattr(merged, key) is None:
+            setattr(merged, key, getattr(pending, key))
+    return merged
+
+
+class EngineBridge(QObject):
+    # emitted on the gui thread with the latest record of each multipv slot, sorted by the multipv index
+    records_ready = pyqtSignal(list)
+    # internal signal to wake up the gui thread. it is always delivered as a queued connection
+    _submitted = pyqtSignal()
+
+    def __init__(self, frame_rate=BRIDGE_FRAME_RATE, parent=None):
+        QObject.__init__(self, parent)
+        self._lock = threading.Lock()
+        # latest record for each multipv slot which has not been delivered yet
+        self._pending = {}
+        self._scheduled = False
+        self._last_flush = 0
+
+        # records received, records replaced by a newer one before delivery and deliveries to the gui
+        self.received = 0
+        self.coalesced = 0
+        self.flushes = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self._submitted.connect(self._schedule, Qt.QueuedConnection)
+
+        self.set_frame_rate(frame_rate)
+
+    def set_frame_rate(self, frame_rate):
+        self.frame_rate = frame_rate
+        self._interval = 1.0 / frame_rate
+
+    def submit(self, record):
+        # can be called from any thread (usually the reader thread of the engine)
+        with self._lock:
+            self.received += 1
+            pending = self._pending.get(record.multipv)
+            if pending is not None:
+                self.coalesced += 1
+                record = _merge(pending, record)
+            self._pending[record.multipv] = record
+
+            # the gui thread has already been woken up
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._submitted.emit()
+
+    def clear(self):
+        # drops all records which have not been delivered yet (e.g. after the position changed)
+        with self._lock:
+            self._pending = {}
+
+    def stats(self):
+        return {'received': self.received, 'coalesced': self.coalesced, 'flushes': self.flushes}
+
+    def _schedule(self):
+        # runs on the gui thread. deliver no more often than the frame rate allows
+        delay = self._last_flush + self._interval - time.monotonic()
+        self._timer.start(max(0, int(delay * 1000)))
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+        self._last_flush = time.monotonic()
+
+        if pending:
+            self.flushes += 1
+            self.records_ready.emit([pending[key] for key in sorted(pending)])
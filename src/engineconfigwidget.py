@@ -7,11 +7,12 @@ import time
 import math
 import psutil
 
-from util import updateStatusBar
-from engines import Engines, Protocol, Engine
+from util import updateStatusBar, getMainWindow
+from engines import ENGINES_XML, Engines, EnginePool, Protocol, Engine, needs_restart
+from configwriter import ConfigWriter
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QStatusBar, QHBoxLayout, QSlider, QLabel, QLineEdit, \
-    QPushButton, QFileDialog, QSpacerItem, QSizePolicy
-from PyQt5.QtCore import QPropertyAnimation, Qt, QEvent
+    QPushButton, QFileDialog, QSpacerItem, QSizePolicy, QCheckBox
+from PyQt5.QtCore import QPropertyAnimation, Qt, QEvent, QTimer
 from PyQt5 import uic
 
 
@@ -159,7 +160,21 @@ class EngineConfigWidget(QWidget):
     def __init__(self):
         super(QWidget, self).__init__()
         self.engines = Engines()
-        self.engines.read_xml(os.path.join(os.path.dirname(__file__), "engines.xml"))
+        self.engines.read_xml(ENGINES_XML)
+        # writes changes to the configuration in the background
+        self.config_writer = ConfigWriter(self.engines)
+        # keeps engines running between analyses
+        self.engine_pool = EnginePool(self.engines)
+        # regularly terminate engines which have been idle for too long
+        self.evict_timer = QTimer(self)
+        self.evict_timer.timeout.connect(self.engine_pool.evict)
+        self.evict_timer.start(10000)
+        # changed options are sent to running engines once the user stopped dragging the slider
+        self.pending_options = set()
+        self.apply_timer = QTimer(self)
+        self.apply_timer.setSingleShot(True)
+        self.apply_timer.setInterval(250)
+        self.apply_timer.timeout.connect(self._apply_options)
         self._load_ui()
 
     def selected_engine(self):
@@ -200,7 +215,22 @@ class EngineConfigWidget(QWidget):
     def update_option(self, key, value):
         if self.selected_engine() in self.engines.engines:
             self.engines.engines[self.selected_engine()].settings['options'][key]['value'] = value
-        self.engines.write_xml('engines.xml')
+            self.pending_options.add(self.selected_engine())
+            self.apply_timer.start()
+        self.config_writer.mark_dirty()
+
+    def update_restart(self, key, restart):
+        # options flagged with restart re-initialise a running engine when they change
+        if self.selected_engine() in self.engines.engines:
+            self.engines.engines[self.selected_engine()].settings['options'][key]['restart'] = restart
+        self.config_writer.mark_dirty()
+
+    def _apply_options(self):
+        # running engines receive the changed options, a running analysis continues with them
+        for name in self.pending_options:
+            self.engine_pool.apply_options(name)
+            getMainWindow().getAnalyseWidget().options_applied(name)
+        self.pending_options.clear()
 
     def _update_proto(self, proto):
 
@@ -211,7 +241,7 @@ class EngineConfigWidget(QWidget):
 
         if self.selected_engine() in self.engines.engines:
             self.engines.engines[self.selected_engine()].settings['proto'] = proto
-        self.engines.write_xml('engines.xml')
+        self.config_writer.mark_dirty()
 
     def _edit_engine_name(self, new_index):
 
@@ -274,7 +304,7 @@ class EngineConfigWidget(QWidget):
 
         if self.selected_engine() in self.engines.engines:
             self.engines.engines[self.selected_engine()].settings['bin'] = exe
-        self.engines.write_xml('engines.xml')
+        self.config_writer.mark_dirty()
 
     def _open_exe_file_dialog(self):
         dlg = QFileDialog(self)
@@ -289,10 +319,12 @@ class EngineConfigWidget(QWidget):
         if self.selected_engine() in self.engines.engines:
             engine = self.engines.engines[self.selected_engine()]
 
-            if not engine.start():
+            # a warm engine from the pool needs to be restarted to detect the options
+            self.engine_pool.terminate(engine)
+
+            # known binaries are answered from the handshake cache without starting them
+            if not engine.detect_options():
                 return
-            else:
-                engine.exit()
             self._update_option_widgets()
 
     def _reset_options(self):
@@ -370,6 +402,12 @@ class EngineConfigWidget(QWidget):
                         listener=self.update_option,
                         init=str(info['value'] if 'value' in info else str(info['default']))))
 
-
-
-
+        # every option can be flagged to require a restart of the engine when it changes
+        options = self.engines.engines[self.selected_engine()].settings['options']
+        for i in range(self.verticalLayout_7.count()):
+            widg = self.verticalLayout_7.itemAt(i).widget()
+            restart = QCheckBox('restart', widg)
+            restart.setToolTip('restart the engine when this option changes')
+            restart.setChecked(needs_restart(options[widg.name]))
+            restart.toggled.connect(lambda checked, name=widg.name: self.update_restart(name, checked))
+            widg.layout().addWidget(restart)
@@ -0,0 +1,274 @@
+import asyncio
+import os
+import selectors
+import threading
+import traceback
+from collections import deque
+
+
+def _resolve_future(future, line):
+    # futures must only be resolved on the thread of their own event loop
+    if not future.done():
+        future.set_result(line)
+
+
+class TokenWaiter:
+
+    def __init__(self, token, collect=False):
+        # the first word of the line we are waiting for (e.g. 'uciok', 'readyok' or 'bestmove')
+        self.token = token
+        # the line which resolved the waiter. stays None if the waiter has been closed or timed out
+        self.line = None
+        # if requested, all lines which arrived before the token are collected
+        self.lines = [] if collect else None
+
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._futures = []
+
+    def done(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        # blocks until the token arrived. returns the line or None if the deadline passed
+        if self._event.wait(timeout):
+            return self.line
+        return None
+
+    async def wait_async(self, timeout=None):
+        # same as wait() but can be awaited from within an event loop
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._event.is_set():
+                return self.line
+            self._futures.append((loop, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _collect(self, line):
+        if self.lines is not None:
+            self.lines.append(line)
+
+    def _resolve(self, line):
+        with self._lock:
+            self.line = line
+            self._event.set()
+            futures, self._futures = self._futures, []
+
+        # wake up everyone who awaits the token inside an event loop
+        for loop, future in futures:
+            loop.call_soon_threadsafe(_resolve_future, future, line)
+
+
+class WaiterChannel:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    def register(self, token, collect=False):
+        # registers a waiter for the given token. this must happen before the command which triggers the token is
+        # sent, otherwise the answer might arrive before anyone listens to it
+        waiter = TokenWaiter(token, collect)
+        with self._lock:
+            self._waiters.append(waiter)
+        return waiter
+
+    def cancel(self, waiter):
+        # removes a waiter which is not needed anymore (e.g. after a timeout)
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def dispatch(self, line):
+        # called by the reader thread for every line the engine sends
+        if not self._waiters:
+            return
+
+        line = line.strip()
+        split = line.split(None, 1)
+        token = split[0] if split else ''
+
+        with self._lock:
+            resolved = []
+            pending = []
+            for waiter in self._waiters:
+                if waiter.token == token:
+                    resolved.append(waiter)
+                else:
+                    waiter._collect(line)
+                    pending.append(waiter)
+            self._waiters = pending
+
+        for waiter in resolved:
+            waiter._resolve(line)
+
+    def close(self):
+        # wakes up all remaining waiters without a line. used when the engine output closes
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter._resolve(None)
+
+
+class LineRingBuffer:
+
+    def __init__(self, capacity=1024):
+        # bounded history of engine lines. if nobody drains it, the oldest lines are overwritten so that the reader
+        # thread never has to block
+        self.capacity = capacity
+        self._lines = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+        # total lines seen, lines overwritten before anyone read them and the highest fill level reached
+        self.total = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return len(self._lines)
+
+    def append(self, line):
+        with self._lock:
+            if len(self._lines) == self.capacity:
+                self.dropped += 1
+            self._lines.append(line)
+            self.total += 1
+            if len(self._lines) > self.high_water:
+                self.high_water = len(self._lines)
+
+    def drain(self):
+        # removes and returns all buffered lines (oldest first)
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+        return lines
+
+    def snapshot(self):
+        # returns all buffered lines (oldest first) without removing them
+        with self._lock:
+            return list(self._lines)
+
+    def clear(self):
+        with self._lock:
+            self._lines.clear()
+
+    def stats(self):
+        return {'total': self.total, 'dropped': self.dropped, 'high_water': self.high_water,
+                'size': len(self._lines), 'capacity': self.capacity}
+
+
+class _SelectorStream:
+    __slots__ = ('fd', 'on_line', 'on_close', 'partial')
+
+    def __init__(self, fd, on_line, on_close):
+        self.fd = fd
+        self.on_line = on_line
+        self.on_close = on_close
+        # bytes after the last newline of the previous chunk
+        self.partial = b''
+
+
+class SelectorLoop:
+
+    def __init__(self, chunk_size=65536):
+        # a single thread which reads the output of many engines. raw chunks are split at the last newline and
+        # decoded once, so a chunk with many info lines costs one read and one decode instead of one per line
+        self.chunk_size = chunk_size
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._pending = []
+        self._thread = None
+
+        # the loop sleeps inside select(), writing to this pipe wakes it up to register new streams
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ, None)
+
+        # amount of reads and lines, used to compare against the thread backend
+        self.reads = 0
+        self.lines = 0
+
+    def register(self, fileobj, on_line, on_close):
+        # on_line receives every line (including its newline) and on_close is called once the stream ended. both
+        # are called on the loop thread, so they must never block on the output of another engine
+        with self._lock:
+            self._pending.append(_SelectorStream(fileobj.fileno(), on_line, on_close))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        os.write(self._wakeup_write, b'\0')
+
+    def streams(self):
+        # amount of registered engine outputs
+        return len(self._selector.get_map()) - 1
+
+    def _register_pending(self):
+        os.read(self._wakeup_read, 4096)
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for stream in pending:
+            self._selector.register(stream.fd, selectors.EVENT_READ, stream)
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    self._register_pending()
+                else:
+                    self._read(key.data)
+
+    def _read(self, stream):
+        try:
+            data = os.read(stream.fd, self.chunk_size)
+        except OSError:
+            data = b''
+        self.reads += 1
+
+        if not data:
+            # the engine closed its output. a line without newline is still delivered
+            self._selector.unregister(stream.fd)
+            if stream.partial:
+                self._deliver(stream, stream.partial + b'\n')
+            try:
+                stream.on_close()
+            except Exception:
+                traceback.print_exc()
+            return
+
+        end = data.rfind(b'\n')
+        if end < 0:
+            stream.partial += data
+            return
+        block = stream.partial + data[:end + 1] if stream.partial else data[:end + 1]
+        stream.partial = data[end + 1:]
+        self._deliver(stream, block)
+
+    def _deliver(self, stream, block):
+        text = block.decode('utf8', 'replace')
+        # same line endings as a pipe opened in text mode
+        if '\r' in text:
+            text = text.replace('\r\n', '\n')
+        lines = text.splitlines(True)
+        self.lines += len(lines)
+        for line in lines:
+            # a broken handler must not stop the output of all other engines
+            try:
+                stream.on_line(line)
+            except Exception:
+                traceback.print_exc()
+
+
+_selector_loop = None
+_selector_loop_lock = threading.Lock()
+
+
+def selector_loop():
+    # the loop shared by all engines which use the selector backend. it is created on first use
+    global _selector_loop
+    with _selector_loop_lock:
+        if _selector_loop is None:
+            _selector_loop = SelectorLoop()
+        return _selector_loop
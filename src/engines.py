@@ -1,8 +1,14 @@
+import asyncio
+import copy
+import os
 import subprocess
 import time
+import psutil
 from util import *
+from engineio import WaiterChannel, LineRingBuffer, selector_loop
+from handshakecache import handshake_cache
+from uciparser import parse_info
 from enum import Enum, IntEnum
-from queue import Queue, Empty
 from threading import Thread
 from xml.etree import cElementTree as ElementTree
 from dicttoxml import dicttoxml
@@ -64,6 +70,224 @@ class Protocol(IntEnum):
     WINBOARD = 2
 
 
+# the engine configuration shared by the gui and the headless tools
+ENGINES_XML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "engines.xml")
+# the time in seconds an engine has to answer a protocol command (e.g. 'uci' or 'isready')
+ENGINE_TIMEOUT = 1
+# the amount of engine lines kept in the history of each engine
+ENGINE_HISTORY_SIZE = 1024
+# the longest line in bytes an AsyncEngine reads from its engine
+ENGINE_LINE_LIMIT = 1 << 20
+# how engine output is read. 'thread' starts a reader thread per engine, 'selector' reads all engines inside one
+# shared loop which scales better with many engines. pipes cannot be selected on windows, so threads are used there
+ENGINE_IO_BACKEND = 'thread'
+# idle engines inside the pool are terminated after this amount of seconds
+POOL_IDLE_TIMEOUT = 600
+# idle engines inside the pool are terminated (longest idle first) once they use more memory than this (in MiB).
+# a budget of 0 disables the memory check
+POOL_MEMORY_BUDGET = 4096
+
+
+class SearchLimit:
+    __slots__ = ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo')
+
+    def __init__(self, depth=None, nodes=None, movetime=None, wtime=None, btime=None, winc=None, binc=None,
+                 movestogo=None):
+        # times are given in milliseconds like in the protocol
+        self.depth = depth
+        self.nodes = nodes
+        self.movetime = movetime
+        self.wtime = wtime
+        self.btime = btime
+        self.winc = winc
+        self.binc = binc
+        self.movestogo = movestogo
+
+    def go_command(self):
+        # creates the uci go command. without any limit, the search is infinite
+        limits = [f"{key} {int(getattr(self, key))}" for key in self.__slots__ if getattr(self, key) is not None]
+        if not limits:
+            return "go infinite"
+        return "go " + ' '.join(limits)
+
+
+class SearchResult:
+    __slots__ = ('bestmove', 'ponder', 'records')
+
+    def __init__(self, bestmove, ponder=None, records=None):
+        # the moves in uci notation
+        self.bestmove = bestmove
+        self.ponder = ponder
+        # the last InfoRecord with a pv for each multipv index
+        self.records = records if records is not None else {}
+
+    def info(self, multipv=1):
+        return self.records.get(multipv)
+
+
+def normalize_settings(settings):
+    # fills in the defaults of the settings read from engines.xml. used by Engine and AsyncEngine
+    # make sure that 'bin' is contained and is not None
+    if 'bin' not in settings or settings['bin'] is None:
+        settings['bin'] = ''
+    # make sure the protocol is set default to UCI
+    if 'proto' not in settings or settings['proto'] is None:
+        settings['proto'] = Protocol.UCI
+    # make sure the options are contained
+    if 'options' not in settings or settings['options'] is None:
+        settings['options'] = {}
+
+    # make sure we have no Nones inside the option values (defaults and values)
+    for option in settings['options']:
+        if 'value' in settings['options'][option] and settings['options'][option]['value'] is None:
+            settings['options'][option]['value'] = ''
+        if 'default' in settings['options'][option] and settings['options'][option]['default'] is None:
+            settings['options'][option]['default'] = ''
+        if 'vals' in settings['options'][option]:
+            d = settings['options'][option]['vals']
+            while 'item' in d:
+                d = d['item']
+            settings['options'][option]['vals'] = d
+    return settings
+
+
+def parse_information(lines, settings):
+    # reads the name, author and options (without values) from the lines an engine sent before 'uciok'. returns
+    # (information, options)
+    information = {'name': '', 'author': ''}
+    new_options = {}
+
+    for line in lines:
+
+        # read the engine name
+        if 'id name' in line and int(settings['proto']) == Protocol.UCI or \
+           'id name' in line and int(settings['proto']) == Protocol.WINBOARD:
+            information['name'] = line[7:].strip()
+
+        # read the author name
+        if 'id author' in line and int(settings['proto']) == Protocol.UCI or \
+           'id author' in line and int(settings['proto']) == Protocol.WINBOARD:
+            information['author'] = line[9:].strip()
+
+        # read options (only supported for uci so far
+        if 'option' in line and int(settings['proto']) == Protocol.UCI:
+            option = {}
+            split = line.split(' ')
+            if not 'name' in line:
+                continue
+            name = split[split.index('name') + 1]
+            if 'type' in line:
+                option['type'] = split[split.index('type') + 1]
+
+                # reading min
+                if 'min' in line:
+                    option['min'] = int(split[split.index('min') + 1])
+
+                # reading max
+                if 'max' in line:
+                    option['max'] = int(split[split.index('max') + 1])
+
+                # reading default value
+                if option['type'] in ('string', 'combo'):
+                    if 'default' in line:
+                        try:
+                            option['default'] = str(split[split.index('default') + 1])
+                        except:
+                            option['default'] = ''
+                elif option['type'] == 'check':
+                    if 'default' in line:
+                        try:
+                            option['default'] = split[split.index('default') + 1].lower() == 'true'
+                        except:
+                            option['default'] = ''
+                else:
+                    if 'default' in line:
+                        try:
+                            option['default'] = int(split[split.index('default') + 1])
+                        except:
+                            option['default'] = ''
+
+                # reading values
+                if option['type'] == 'combo':
+                    vals = []
+                    for i in range(len(split) - 1):
+                        if split[i] == 'var':
+                            vals += [split[i+1]]
+                    option['vals'] = vals
+
+            # place in new options list
+            new_options[name] = option
+
+    return information, new_options
+
+
+def merge_options(options, settings):
+    # copies the parsed options and keeps the values of the existing settings. new options use their default
+    new_options = {}
+    for name, option in options.items():
+        option = dict(option)
+        if name in settings['options'] and 'value' in settings['options'][name]:
+            option['value'] = settings['options'][name]['value']
+        elif 'default' in option:
+            option['value'] = option['default']
+        if name in settings['options'] and 'restart' in settings['options'][name]:
+            option['restart'] = needs_restart(settings['options'][name])
+        new_options[name] = option
+    return new_options
+
+
+def needs_restart(option):
+    # options flagged with 'restart' (e.g. Hash on some engines) only take effect on a fresh process. the flag comes
+    # back as text from engines.xml
+    return str(option.get('restart', False)).lower() in ('true', '1')
+
+
+def option_text(option, value):
+    # the value as it is sent to the engine, None if it is not set. check options are compared as booleans (they
+    # come back from engines.xml as 'True' or 'true'), all others by their text. only strings may be empty
+    if value is None or value == '' and option.get('type') != 'string':
+        return None
+    if option.get('type') == 'check':
+        return 'true' if str(value).lower() in ('true', '1') else 'false'
+    return str(value)
+
+
+def acknowledged_defaults(options):
+    # a fresh engine uses the defaults it announced, so they do not need to be sent
+    acknowledged = {}
+    for name, option in options.items():
+        text = option_text(option, option.get('default'))
+        if text is not None:
+            acknowledged[name] = text
+    return acknowledged
+
+
+def changed_options(settings, applied):
+    # returns name -> value of all options whose value differs from the state the engine acknowledged
+    changed = {}
+    for name, option in settings['options'].items():
+        text = option_text(option, option.get('value'))
+        if text is not None and text != applied.get(name):
+            changed[name] = text
+    return changed
+
+
+def search_result(waiter):
+    # builds the SearchResult from a collecting waiter which was resolved by 'bestmove'
+    # keep the last info with a pv for each multipv index
+    records = {}
+    for line in waiter.lines:
+        if line.startswith('info') and ' pv ' in line:
+            record = parse_info(line)
+            if record is not None and record.pv:
+                records[record.multipv] = record
+
+    split = waiter.line.split()
+    bestmove = split[1] if len(split) > 1 else None
+    ponder = split[3] if len(split) > 3 and split[2] == 'ponder' else None
+    return SearchResult(bestmove, ponder, records)
+
+
 class Engine:
 
     def __init__(self, **kwargs):
@@ -72,36 +296,38 @@ class Engine:
             kwargs = kwargs['args']
 
         # set the settings
-        self.settings = kwargs
+        self.settings = normalize_settings(kwargs)
         # set the name and author information
         self.information = {'name': '', 'author': ''}
         # remember nothing is running
         self.is_running = False
         self.is_searching = False
+        # the root position of the game the engine currently analyses. None if the engine has a fresh game state
+        self.root_fen = None
+        # the arguments of the running search, so it can be restarted after the options changed
+        self.search_args = None
+        # option name -> value the running process acknowledged
+        self.applied_options = {}
         # store a potential listener which receives the lines the engine sends
         self.listener = None
-
-        # make sure that 'bin' is contained and is not None
-        if 'bin' not in self.settings or self.settings['bin'] is None:
-            self.settings['bin'] = ''
-        # make sure the protocol is set default to UCI
-        if 'proto' not in self.settings or self.settings['proto'] is None:
-            self.settings['proto'] = Protocol.UCI
-        # make sure the options are contained
-        if 'options' not in self.settings or self.settings['options'] is None:
-            self.settings['options'] = {}
-
-        # make sure we have no Nones inside the option values (defaults and values)
-        for option in self.settings['options']:
-            if 'value' in self.settings['options'][option] and self.settings['options'][option]['value'] is None:
-                self.settings['options'][option]['value'] = ''
-            if 'default' in self.settings['options'][option] and self.settings['options'][option]['default'] is None:
-                self.settings['options'][option]['default'] = ''
-            if 'vals' in self.settings['options'][option]:
-                d = self.settings['options'][option]['vals']
-                while 'item' in d:
-                    d = d['item']
-                self.settings['options'][option]['vals'] = d
+        # store a potential listener which receives the parsed info lines
+        self.info_listener = None
+        # callers which await protocol tokens like 'uciok', 'readyok' or 'bestmove'
+        self.waiters = WaiterChannel()
+        # the 'readyok' of a cached handshake which has been sent but not awaited yet, see _retrieve_information
+        self._handshake = None
+        # bounded history of the lines the engine sent
+        self.history = LineRingBuffer(ENGINE_HISTORY_SIZE)
+        # 'thread' or 'selector', see ENGINE_IO_BACKEND
+        self.io_backend = ENGINE_IO_BACKEND
+        # the selector backend opens the pipes in binary mode, so lines must be encoded before sending
+        self._binary_io = False
+
+    def clone(self):
+        # creates another engine with the same settings which can run next to this one
+        engine = Engine(args=copy.deepcopy(self.settings))
+        engine.io_backend = self.io_backend
+        return engine
 
     def create_dict(self):
         # make sure we store the mapped integer of the protocol
@@ -121,23 +347,37 @@ class Engine:
         # remember the engine is running and no search has started
         self.is_running = True
         self.is_searching = False
+        self.root_fen = None
+        self.applied_options = {}
 
         # try to start the process
         try:
-            self.process = subprocess.Popen([self.settings['bin']], stdout=subprocess.PIPE, stdin=subprocess.PIPE,
-                                            bufsize=1, encoding="utf8")
-
-            # have a queue to write previous entries
-            self.queue = Queue(maxsize=1024)
+            # forget the lines of a previous run. the reader of a previous process closes its own waiters only
+            self.history.clear()
+            waiters = self.waiters = WaiterChannel()
+
+            self._binary_io = self.io_backend == 'selector' and os.name != 'nt'
+            if self._binary_io:
+                # unbuffered binary pipes, the shared loop reads and decodes the output in chunks
+                self.process = subprocess.Popen([self.settings['bin']], stdout=subprocess.PIPE, stdin=subprocess.PIPE,
+                                                bufsize=0)
+                self.thread = None
+
+                # let the shared loop await lines from the engine
+                out = self.process.stdout
+                selector_loop().register(out, self._handle_line, lambda: self._output_closed(out, waiters))
+            else:
+                self.process = subprocess.Popen([self.settings['bin']], stdout=subprocess.PIPE, stdin=subprocess.PIPE,
+                                                bufsize=1, encoding="utf8")
 
-            # have a thread which awaits lines from the engine
-            self.thread = Thread(target=self._enqueue_output, args=(self.process.stdout, self.queue))
+                # have a thread which awaits lines from the engine
+                self.thread = Thread(target=self._enqueue_output, args=(self.process.stdout, waiters))
 
-            # thread dies with the program
-            self.thread.daemon = True
+                # thread dies with the program
+                self.thread.daemon = True
 
-            # start the thread
-            self.thread.start()
+                # start the thread
+                self.thread.start()
         except:
             # some error happened, set the process to None
             self.process = None
@@ -157,7 +397,19 @@ class Engine:
         # started successfully
         return True
 
+    def detect_options(self):
+        # reads the name, author and options. a known binary does not need to be started for that
+        if int(self.settings['proto']) == Protocol.UCI and self._apply_cached_information():
+            return True
+        if not self.start():
+            return False
+        self.exit()
+        return True
+
     def send_line(self, line):
+        return self.send_lines(line)
+
+    def send_lines(self, *lines):
         # make sure the state is valid
         self._update_state()
 
@@ -167,8 +419,12 @@ class Engine:
             # line sending was not successfully
             return False
 
-        # write the line to the stdin
-        self.process.stdin.write(line + "\n")
+        # write all lines at once to the stdin
+        text = "\n".join(lines) + "\n"
+        if self._binary_io:
+            self.process.stdin.write(text.encode())
+        else:
+            self.process.stdin.write(text)
 
         # flush the output
         self.process.stdin.flush()
@@ -176,14 +432,62 @@ class Engine:
         # line sending was successfully
         return True
 
+    def send_and_wait(self, token, *lines, timeout=ENGINE_TIMEOUT, collect=False):
+        # sends the given lines and blocks until the engine answers with the token. the waiter is registered before
+        # sending so the answer cannot be missed. returns the waiter or None if the engine did not answer in time
+        if not self._finish_handshake(timeout):
+            return None
+        waiter = self.waiters.register(token, collect=collect)
+        self.send_lines(*lines)
+        if waiter.wait(timeout) is None:
+            self.waiters.cancel(waiter)
+            return None
+        return waiter
+
+    def is_ready(self, timeout=ENGINE_TIMEOUT):
+        # synchronises with the engine using 'isready'. the one sent with a cached handshake is enough
+        if self._handshake is not None:
+            return self._finish_handshake(timeout)
+        if int(self.settings['proto']) == Protocol.UCI:
+            return self.send_and_wait('readyok', 'isready', timeout=timeout) is not None
+        return self.is_running
+
     def send_options(self):
-        # sends the options to the engine
+        # sends the options which differ from what the engine acknowledged in a single write followed by 'isready'.
+        # returns False if the engine did not confirm them
         if int(self.settings['proto']) == Protocol.UCI:
-            for option in self.settings['options']:
-                if 'value' in self.settings['options'][option] and self.settings['options'][option]['value'] is not None:
-                    self.send_line(f'setoption name {option} value {self.settings["options"][option]["value"]}')
+            changed = changed_options(self.settings, self.applied_options)
+            if not changed:
+                return True
+            lines = [f'setoption name {name} value {value}' for name, value in changed.items()]
+            if self.send_and_wait('readyok', *lines, 'isready') is None:
+                return False
+            self.applied_options.update(changed)
         elif int(self.settings['proto']) == Protocol.WINBOARD:
             pass
+        return True
+
+    def apply_options(self):
+        # brings a running engine up to date with its settings. a running search is stopped, receives the new
+        # options and continues. changed options flagged with 'restart' re-initialise the engine
+        self._update_state()
+        if not self.is_running or int(self.settings['proto']) != Protocol.UCI:
+            return False
+        changed = changed_options(self.settings, self.applied_options)
+        if not changed:
+            return True
+
+        search = self.search_args if self.is_searching else None
+        if search is not None:
+            self.stop_search()
+        if any(needs_restart(self.settings['options'][name]) for name in changed):
+            self.exit()
+            if not self.start():
+                return False
+        applied = self.send_options()
+        if search is not None:
+            self.search(*search)
+        return applied
 
     def exit(self):
         # update the state to make sure the engine did not crash
@@ -208,11 +512,13 @@ class Engine:
 
         # remember no process is running
         self.is_running = False
+        self._handshake = None
 
         # successfully stopped
         return True
 
-    def search(self, fen, moves=''):
+    def search(self, fen, moves='', limit=None):
+        # starts searching the position. without a limit, the search runs until it is stopped
         # update the state to make sure the engine did not crash
         self._update_state()
 
@@ -223,9 +529,15 @@ class Engine:
         # if we already search, stop the previous search
         if self.is_searching:
             self.stop_search()
+        self.search_args = (fen, moves, limit)
 
         # sending the position to the engine
         if int(self.settings['proto']) == Protocol.UCI:
+            # only start a new game if the root changed. otherwise the engine can keep its hash and history
+            if self.root_fen is not None and self.root_fen != fen:
+                self.send_line("ucinewgame")
+            self.root_fen = fen
+
             if moves:
                 self.send_line(f"position fen {fen} moves {moves}")
             else:
@@ -238,10 +550,53 @@ class Engine:
 
         # starting the search
         if int(self.settings['proto']) == Protocol.UCI:
-            self.send_line(f"go infinite")
+            self.send_line(limit.go_command() if limit is not None else "go infinite")
         elif int(self.settings['proto']) == Protocol.WINBOARD:
             pass
 
+        return True
+
+    def search_wait(self, fen, moves='', limit=None, timeout=None, on_info=None):
+        # searches the position with the given limit and blocks until the engine answers with its best move.
+        # on_info receives every parsed info line on the reader thread and can stop the search early by returning
+        # True. returns a SearchResult or None if the engine did not answer in time
+        self._update_state()
+        if not self.is_running or int(self.settings['proto']) != Protocol.UCI:
+            return None
+
+        # stop a previous search first so its best move is not taken for ours
+        if self.is_searching:
+            self.stop_search()
+
+        previous_listener = self.info_listener
+        if on_info is not None:
+            stopped = False
+
+            def listener(record):
+                nonlocal stopped
+                if not stopped and on_info(record):
+                    stopped = True
+                    self.send_line("stop")
+            self.info_listener = listener
+
+        waiter = self.waiters.register('bestmove', collect=True)
+        self.search(fen, moves, limit)
+        line = waiter.wait(timeout)
+        self.info_listener = previous_listener
+        if line is None:
+            self.waiters.cancel(waiter)
+            self.stop_search()
+            return None
+        self.is_searching = False
+
+        return search_result(waiter)
+
+    def new_game(self):
+        # tells the engine that the next search belongs to a different game
+        if int(self.settings['proto']) == Protocol.UCI:
+            self.send_line("ucinewgame")
+        self.root_fen = None
+
     def stop_search(self):
         # make sure the state is valid
         self._update_state()
@@ -253,52 +608,45 @@ class Engine:
         # remember we stopped searching
         self.is_searching = False
 
-        # send the stop command and check if the engine is ready
+        # send the stop command and wait until the engine is ready again
         if int(self.settings['proto']) == Protocol.UCI:
-            self.send_line("stop")
-            self.send_line("isready")
-        elif int(self.settings['proto']) == Protocol.WINBOARD:
-            pass
-
-        # measure the time it takes. If the engine does not properly handle the protocols, we will notify the user
-        start_time = time.perf_counter()
-
-        while True:
-            # check if retrieving information took longer than a full second -> crash or invalid
-            if time.perf_counter() - start_time > 1:
+            if self.send_and_wait('readyok', 'stop', 'isready') is None:
+                # the engine does not properly handle the protocol, we will notify the user
                 updateStatusBar("Engine timeout!")
                 self.exit()
-                return
-            # poll from the queue to read the buffer
-            try:
-                line = self.queue.get_nowait()
-            except Empty:
-                # if nothing new has been received, sleep for a bit
-                time.sleep(0.01)
-
-                # continue to the next iteration
-                continue
-
-            if int(self.settings['proto']) == Protocol.UCI:
-                if 'readyok' in line:
-                    break
-            elif int(self.settings['proto']) == Protocol.WINBOARD:
-                pass
-        # wait another 0.1 seconds
-        time.sleep(0.1)
+                return False
+        elif int(self.settings['proto']) == Protocol.WINBOARD:
+            pass
 
+        return True
 
-    def _enqueue_output(self, out, queue):
+    def _enqueue_output(self, out, waiters):
         # thread awaits outputs from the engine
-        for line in iter(out.readline, b''):
+        for line in iter(out.readline, ''):
             # do not process empty lines
             if line:
-                # print(f"[READING] {line}")
-                # add it to the queue
-                queue.put(line)
-                # if someone is listening, notify him
-                if self.listener is not None:
-                    self.listener(line)
+                self._handle_line(line)
+        self._output_closed(out, waiters)
+
+    def _handle_line(self, line):
+        # called for every line the engine sends, either by the reader thread or by the shared selector loop
+        # print(f"[READING] {line}")
+        # wake up everyone waiting for this line
+        self.waiters.dispatch(line)
+        # add it to the history. it overwrites the oldest lines instead of blocking the engine
+        self.history.append(line)
+        # if someone is listening, notify him
+        if self.listener is not None:
+            self.listener(line)
+        # parse info lines here so the receiver does not need to
+        if self.info_listener is not None and line.startswith('info'):
+            record = parse_info(line)
+            if record is not None:
+                self.info_listener(record)
+
+    def _output_closed(self, out, waiters):
+        # nobody will answer anymore
+        waiters.close()
         # close the output
         out.close()
 
@@ -306,6 +654,10 @@ class Engine:
         # add a listener
         self.listener = func
 
+    def listen_info(self, func):
+        # add a listener which receives an InfoRecord for each info line. it is called on the reader thread
+        self.info_listener = func
+
     def _update_state(self):
         # if we are running but the process died, make sure we stopped
         if self.is_running:
@@ -321,102 +673,311 @@ class Engine:
         if not self.is_running:
             return
 
-        # send the command to poll for options
-        self.send_line("uci" if int(self.settings['proto']) == Protocol.UCI else 'uci')
+        # a binary we talked to before answers the same, so its options do not need to be collected and parsed. the
+        # changed options follow 'uci' right away and a single 'isready' confirms both. its answer is only awaited
+        # before the engine is waited for the next time, so engines which are started together boot side by side
+        if int(self.settings['proto']) == Protocol.UCI and self._apply_cached_information():
+            changed = changed_options(self.settings, self.applied_options)
+            lines = [f'setoption name {name} value {value}' for name, value in changed.items()]
+            self._handshake = self.waiters.register('readyok')
+            self.send_lines("uci", *lines, "isready")
+            self.applied_options.update(changed)
+            return
+
+        # send the command to poll for options and collect everything until the engine is done
+        waiter = self.send_and_wait('uciok', "uci" if int(self.settings['proto']) == Protocol.UCI else 'uci',
+                                    collect=True)
+
+        # check if retrieving information took longer than a full second -> crash or invalid
+        if waiter is None:
+            updateStatusBar("Error retrieving options. Using this engine can lead to potential crashes "
+                            "since it does not implement the Protocol correctly")
+            return
 
         # since the options may change if the exe changes, we need to overwrite previous entries but keep existing
         # values
-        new_options = {}
+        self.information, options = parse_information(waiter.lines, self.settings)
+        if int(self.settings['proto']) == Protocol.UCI:
+            handshake_cache().store(self.settings['bin'], self.information, options)
+            self.applied_options = acknowledged_defaults(options)
+        self.settings['options'] = merge_options(options, self.settings)
+
+    def _finish_handshake(self, timeout=ENGINE_TIMEOUT):
+        # awaits the 'readyok' of a cached handshake. returns False if the engine did not answer it in time
+        if self._handshake is None:
+            return True
+        waiter, self._handshake = self._handshake, None
+        if waiter.wait(timeout) is None:
+            self.waiters.cancel(waiter)
+            updateStatusBar("Error retrieving options. Using this engine can lead to potential crashes "
+                            "since it does not implement the Protocol correctly")
+            return False
+        return True
 
-        # measure the time it takes. If the engine does not properly handle the protocols, we will notify the user
-        start_time = time.perf_counter()
+    def _apply_cached_information(self):
+        # uses the name, author and options of a previous handshake with the same binary. returns False if unknown
+        cached = handshake_cache().lookup(self.settings['bin'])
+        if cached is None:
+            return False
+        self.information, options = cached
+        self.settings['options'] = merge_options(options, self.settings)
+        if self.is_running:
+            self.applied_options = acknowledged_defaults(options)
+        return True
 
-        while True:
 
-            # check if retrieving information took longer than a full second -> crash or invalid
-            if time.perf_counter() - start_time > 1:
-                updateStatusBar("Error retrieving options. Using this engine can lead to potential crashes "
-                                "since it does not implement the Protocol correctly")
-                return
-            # poll from the queue to read the buffer
-            try:
-                line = self.queue.get_nowait()
-            except Empty:
-                # if nothing new has been received, sleep for a bit
-                time.sleep(0.01)
+class AsyncEngine:
 
-                # continue to the next iteration
-                continue
+    def __init__(self, **kwargs):
+        # same settings as Engine, e.g. AsyncEngine(args=copy.deepcopy(engines.engines['Stockfish'].settings))
+        if 'args' in kwargs:
+            kwargs = kwargs['args']
+
+        self.settings = normalize_settings(kwargs)
+        self.information = {'name': '', 'author': ''}
+        self.process = None
+        # the root position of the game the engine currently analyses. None if the engine has a fresh game state
+        self.root_fen = None
+        # option name -> value the running process acknowledged
+        self.applied_options = {}
+        # callers which await protocol tokens like 'uciok', 'readyok' or 'bestmove'
+        self.waiters = WaiterChannel()
+        # bounded history of the lines the engine sent
+        self.history = LineRingBuffer(ENGINE_HISTORY_SIZE)
+
+        # the task reading the engine output and the queue of the running analyse() call
+        self._reader = None
+        self._records = None
+        # only one search can run at a time, concurrent callers wait for their turn
+        self._search_lock = asyncio.Lock()
+
+    @staticmethod
+    def from_engine(engine):
+        # creates an async engine with a copy of the settings of the given Engine
+        return AsyncEngine(args=copy.deepcopy(engine.settings))
+
+    @property
+    def is_running(self):
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self, timeout=ENGINE_TIMEOUT):
+        # starts the process and reads the name, author and options. returns False if the engine did not start or did
+        # not answer 'uci' in time
+        if self.is_running:
+            return False
+        if int(self.settings['proto']) != Protocol.UCI:
+            return False
+
+        try:
+            self.process = await asyncio.create_subprocess_exec(self.settings['bin'], stdin=subprocess.PIPE,
+                                                                stdout=subprocess.PIPE, limit=ENGINE_LINE_LIMIT)
+        except OSError:
+            self.process = None
+            return False
+        self.root_fen = None
+        self.history.clear()
+        self._reader = asyncio.create_task(self._read(self.process.stdout))
+
+        # a known binary skips parsing the handshake and gets its options with it, see Engine._retrieve_information
+        cached = handshake_cache().lookup(self.settings['bin'])
+        if cached is not None:
+            self.information, options = cached
+            self.settings['options'] = merge_options(options, self.settings)
+            self.applied_options = acknowledged_defaults(options)
+            changed = changed_options(self.settings, self.applied_options)
+            lines = [f'setoption name {name} value {value}' for name, value in changed.items()]
+            if await self.send_and_wait('readyok', 'uci', *lines, 'isready', timeout=timeout) is None:
+                await self.exit()
+                return False
+            self.applied_options.update(changed)
+            return True
+
+        waiter = await self.send_and_wait('uciok', 'uci', timeout=timeout, collect=True)
+        if waiter is None:
+            await self.exit()
+            return False
+        self.information, options = parse_information(waiter.lines, self.settings)
+        handshake_cache().store(self.settings['bin'], self.information, options)
+        self.settings['options'] = merge_options(options, self.settings)
+        self.applied_options = acknowledged_defaults(options)
+        return True
+
+    def send_line(self, line):
+        return self.send_lines(line)
+
+    def send_lines(self, *lines):
+        # the lines are buffered by the transport, so writing never blocks the event loop
+        if not self.is_running:
+            return False
+        self.process.stdin.write(("\n".join(lines) + "\n").encode())
+        return True
+
+    async def send_and_wait(self, token, *lines, timeout=ENGINE_TIMEOUT, collect=False):
+        # see Engine.send_and_wait
+        waiter = self.waiters.register(token, collect=collect)
+        self.send_lines(*lines)
+        if await waiter.wait_async(timeout) is None:
+            self.waiters.cancel(waiter)
+            return None
+        return waiter
+
+    async def is_ready(self, timeout=ENGINE_TIMEOUT):
+        return await self.send_and_wait('readyok', 'isready', timeout=timeout) is not None
+
+    async def send_options(self):
+        # see Engine.send_options
+        changed = changed_options(self.settings, self.applied_options)
+        if not changed:
+            return True
+        lines = [f'setoption name {name} value {value}' for name, value in changed.items()]
+        if await self.send_and_wait('readyok', *lines, 'isready') is None:
+            return False
+        self.applied_options.update(changed)
+        return True
+
+    def new_game(self):
+        self.send_line("ucinewgame")
+        self.root_fen = None
+
+    async def search(self, fen, moves='', limit=None, timeout=None):
+        # searches until the engine answers with its best move and returns the SearchResult or None if the engine did
+        # not answer in time. cancelling the call stops the search and awaits the best move before it returns
+        async with self._search_lock:
+            waiter = self._go(fen, moves, limit)
+            try:
+                line = await waiter.wait_async(timeout)
+            except asyncio.CancelledError:
+                await self._stop(waiter)
+                raise
+            if line is None:
+                await self._stop(waiter)
+                return None
+            return search_result(waiter)
+
+    def analyse(self, fen, moves='', limit=None):
+        # returns an Analysis which yields an InfoRecord for each info line until the search finished. without a
+        # limit the search runs until the analysis is stopped:
+        #
+        #   async with engine.analyse(fen) as analysis:
+        #       async for record in analysis:
+        #           ...
+        return Analysis(self, self._analyse(fen, moves, limit))
+
+    async def _analyse(self, fen, moves, limit):
+        async with self._search_lock:
+            self._records = asyncio.Queue()
+            waiter = self._go(fen, moves, limit)
+            # nobody reads the output anymore, so no record or best move will come
+            if self._reader is None or self._reader.done():
+                self._records.put_nowait(None)
+            try:
+                while True:
+                    record = await self._records.get()
+                    # None marks the best move or the end of the engine output
+                    if record is None:
+                        break
+                    yield record
+            finally:
+                self._records = None
+                if not waiter.done():
+                    await self._stop(waiter)
+
+    async def exit(self, timeout=ENGINE_TIMEOUT):
+        if self.process is None:
+            return False
+        if self.is_running:
+            self.send_line("quit")
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        if self._reader is not None:
+            await self._reader
+            self._reader = None
+        return True
 
-            # strip white spaces and line breaks
-            line = line.strip()
-
-            # check if all options have been read
-            if 'uciok' in line and int(self.settings['proto']) == Protocol.UCI or \
-               'uciok' in line and int(self.settings['proto']) == Protocol.WINBOARD:
-                break
-
-            # read the engine name
-            if 'id name' in line and int(self.settings['proto']) == Protocol.UCI or \
-               'id name' in line and int(self.settings['proto']) == Protocol.WINBOARD:
-                self.information['name'] = line[7:].strip()
-
-            # read the author name
-            if 'id author' in line and int(self.settings['proto']) == Protocol.UCI or \
-               'id author' in line and int(self.settings['proto']) == Protocol.WINBOARD:
-                self.information['author'] = line[9:].strip()
-
-            # read options (only supported for uci so far
-            if 'option' in line and int(self.settings['proto']) == Protocol.UCI:
-                option = {}
-                split = line.split(' ')
-                if not 'name' in line:
-                    continue
-                name = split[split.index('name') + 1]
-                if 'type' in line:
-                    option['type'] = split[split.index('type') + 1]
-
-                    # reading min
-                    if 'min' in line:
-                        option['min'] = int(split[split.index('min') + 1])
-
-                    # reading max
-                    if 'max' in line:
-                        option['max'] = int(split[split.index('max') + 1])
-
-                    # reading default value
-                    if option['type'] == 'string':
-                        if 'default' in line:
-                            try:
-                                option['default'] = str(split[split.index('default') + 1])
-                            except:
-                                option['default'] = ''
-                    else:
-                        if 'default' in line:
-                            try:
-                                option['default'] = int(split[split.index('default') + 1])
-                            except:
-                                option['default'] = ''
-
-                    # reading values
-                    if option['type'] == 'combo':
-                        vals = []
-                        for i in range(len(split) - 1):
-                            if split[i] == 'var':
-                                vals += [split[i+1]]
-                        option['vals'] = vals
-
-                # make sure to copy the old value
-                if name in self.settings['options'] and 'value' in self.settings['options'][name]:
-                    option['value'] = self.settings['options'][name]['value']
-                elif 'default' in option:
-                    option['value'] = option['default']
-
-                # place in new options list
-                new_options[name] = option
-
-        # use new options list
-        self.settings['options'] = new_options
+    def _go(self, fen, moves, limit):
+        # the waiter is registered before the go command so the best move cannot be missed
+        waiter = self.waiters.register('bestmove', collect=True)
+        # only start a new game if the root changed. otherwise the engine can keep its hash and history
+        if self.root_fen is not None and self.root_fen != fen:
+            self.send_line("ucinewgame")
+        self.root_fen = fen
+        self.send_line(f"position fen {fen} moves {moves}" if moves else f"position fen {fen}")
+        self.send_line(limit.go_command() if limit is not None else "go infinite")
+        return waiter
+
+    async def _stop(self, waiter, timeout=ENGINE_TIMEOUT):
+        # stops the search and awaits the best move so it is not taken for the answer of the next search
+        self.send_line("stop")
+        if await waiter.wait_async(timeout) is None:
+            self.waiters.cancel(waiter)
+            # the engine does not properly handle the protocol
+            if self.is_running:
+                self.process.kill()
+
+    async def _read(self, out):
+        try:
+            while True:
+                try:
+                    line = await out.readline()
+                except ValueError:
+                    # a line longer than the stream limit. the output can not be followed anymore, so the engine is
+                    # stopped like one which closed its output
+                    updateStatusBar(f"{self.settings['bin']} sent a line longer than {ENGINE_LINE_LIMIT} bytes")
+                    if self.is_running:
+                        self.process.kill()
+                    break
+                if not line:
+                    break
+                line = line.decode('utf8', 'replace')
+                if '\r' in line:
+                    line = line.replace('\r\n', '\n')
+
+                self.waiters.dispatch(line)
+                self.history.append(line)
+                if self._records is not None:
+                    if line.startswith('info'):
+                        record = parse_info(line)
+                        if record is not None:
+                            self._records.put_nowait(record)
+                    elif line.startswith('bestmove'):
+                        self._records.put_nowait(None)
+        finally:
+            # nobody will answer anymore
+            self.waiters.close()
+            if self._records is not None:
+                self._records.put_nowait(None)
+
+
+class Analysis:
+
+    def __init__(self, engine, records):
+        # the search started by AsyncEngine.analyse. the engine is busy until the analysis is stopped or its
+        # records are exhausted, so it should be used with async with (or stopped explicitly)
+        self.engine = engine
+        self._records = records
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._records.__anext__()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def stop(self):
+        # stops the search, awaits the best move and lets the next search run
+        if self._records.ag_running:
+            # another task waits for the next record. the best move ends its loop, which then stops the search
+            self.engine.send_line("stop")
+        else:
+            await self._records.aclose()
 
 
 class Engines:
@@ -437,22 +998,147 @@ class Engines:
         for key in xmldict:
             self.engines[key] = Engine(args=xmldict[key])
 
+    def snapshot(self):
+        # copies the settings of all engines so they can be written while the gui keeps changing them
+        return {name: copy.deepcopy(engine.create_dict()) for name, engine in self.engines.items()}
+
     def write_xml(self, file):
         # writes the engines to a xml file
-        out_dict = {}
+        Engines.dump_xml(self.snapshot(), file)
 
-        # write a dictionary for each engine
-        for i in self.engines:
-            out_dict[i] = self.engines[i].create_dict()
-
-        # write the xml
-        xml = dicttoxml(out_dict, attr_type=False)
+    @staticmethod
+    def dump_xml(settings, file):
+        # writes a snapshot of the settings. a temporary file is renamed so a crash never leaves a broken file behind
+        xml = dicttoxml(settings, attr_type=False)
         dom = parseString(xml)
 
         # make it pretty
-        f = open(file, "w")
-        f.write(dom.toprettyxml())
-        f.close()
+        temp = file + '.tmp'
+        with open(temp, "w") as f:
+            f.write(dom.toprettyxml())
+        os.replace(temp, file)
+
+
+class EnginePool:
+
+    def __init__(self, engines, idle_timeout=POOL_IDLE_TIMEOUT, memory_budget=POOL_MEMORY_BUDGET):
+        # the configured engines which can be acquired by name
+        self.engines = engines
+        self.idle_timeout = idle_timeout
+        self.memory_budget = memory_budget
+
+        # all engines the pool started, mapped to the binary they have been started with
+        self._binaries = {}
+        # engines which are running but not used, mapped to the time since when they are idle
+        self._idle = {}
+
+    def _memory(self, engine):
+        # resident memory of the engine process in MiB
+        try:
+            return psutil.Process(engine.process.pid).memory_info().rss / 1024 / 1024
+        except (psutil.Error, AttributeError):
+            return 0
+
+    def acquire(self, name):
+        # returns a running engine for the given name. warm engines are reused, otherwise a new process is started
+        if name not in self.engines.engines:
+            return None
+        engine = self.engines.engines[name]
+        engine._update_state()
+
+        # forget engines which died in the meantime
+        if not engine.is_running:
+            self._forget(engine)
+
+        # the binary might have been changed inside the config since the engine has been started
+        if engine in self._binaries and self._binaries[engine] != engine.settings['bin']:
+            self.terminate(engine)
+
+        if not engine.is_running:
+            if not engine.start():
+                return None
+            self._binaries[engine] = engine.settings['bin']
+            engine.send_options()
+        else:
+            # only the options which changed since the last use are sent. this avoids reallocating the hash table
+            engine.apply_options()
+        if not engine.is_running:
+            self._forget(engine)
+            return None
+
+        self._idle.pop(engine, None)
+        self.evict()
+        return engine
+
+    def release(self, name):
+        # puts the engine back into the pool without terminating the process
+        if name not in self.engines.engines:
+            return
+        engine = self.engines.engines[name]
+
+        # nothing to do if the engine is not ours or already idle
+        if engine not in self._binaries or engine in self._idle:
+            return
+
+        engine.listen(None)
+        engine.listen_info(None)
+        engine.stop_search()
+        engine._update_state()
+        if not engine.is_running:
+            self._forget(engine)
+            return
+
+        # make sure the next analysis does not reuse the search state of this one
+        engine.new_game()
+
+        self._idle[engine] = time.monotonic()
+        self.evict()
+
+    def evict(self):
+        # terminates idle engines which exceeded the idle timeout or the memory budget and engines which have been
+        # removed from the config
+        now = time.monotonic()
+        configured = list(self.engines.engines.values())
+        for engine, since in list(self._idle.items()):
+            if now - since > self.idle_timeout or engine not in configured:
+                self.terminate(engine)
+
+        if self.memory_budget > 0:
+            usage = {engine: self._memory(engine) for engine in self._idle}
+            total = sum(usage.values())
+
+            # terminate the engines which are idle the longest first
+            for engine in sorted(self._idle, key=lambda e: self._idle[e]):
+                if total <= self.memory_budget:
+                    break
+                total -= usage[engine]
+                self.terminate(engine)
+
+    def apply_options(self, name):
+        # sends changed options to a running engine of the pool, also while it analyses
+        if name not in self.engines.engines:
+            return
+        engine = self.engines.engines[name]
+        if engine in self._binaries and engine.is_running:
+            engine.apply_options()
+
+    def terminate(self, engine):
+        # terminates the given engine (or engine name) and removes it from the pool
+        if isinstance(engine, str):
+            if engine not in self.engines.engines:
+                return
+            engine = self.engines.engines[engine]
+        engine.exit()
+        self._forget(engine)
+
+    def shutdown(self):
+        # terminates all engines started by the pool
+        for engine in list(self._binaries):
+            self.terminate(engine)
+
+    def _forget(self, engine):
+        self._binaries.pop(engine, None)
+        self._idle.pop(engine, None)
 
 
 if __name__ == '__main__':
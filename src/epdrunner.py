@@ -0,0 +1,183 @@
+# runs an epd test suite (bm / am operations) with one or more engines. the positions are distributed over several
+# engine processes and each position is stopped as soon as the engine kept a correct best move for a number of
+# consecutive depths
+#
+#   python epdrunner.py suite.epd -e Stockfish -e Koivisto --concurrency 8 --movetime 10000 --consecutive 3
+import argparse
+import os
+import sys
+import threading
+import time
+from queue import Queue
+
+import chess
+
+from headless import add_engine_arguments, add_limit_arguments, load_engines, set_io_backend, spawn, Progress
+from engines import SearchLimit
+
+
+def read_suite(path):
+    # returns a list of (board, operations) for every position with a bm or am operation
+    suite = []
+    with open(path, encoding='utf8') as handle:
+        for line in handle:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            board = chess.Board()
+            try:
+                operations = board.set_epd(line)
+            except ValueError as error:
+                sys.stderr.write(f"skipping invalid epd '{line}': {error}\n")
+                continue
+            if 'bm' in operations or 'am' in operations:
+                suite.append((board, operations))
+    return suite
+
+
+class Attempt:
+
+    def __init__(self, board, operations, consecutive):
+        self.board = board
+        self.best = set(move.uci() for move in operations.get('bm', []))
+        self.avoid = set(move.uci() for move in operations.get('am', []))
+        self.consecutive = consecutive
+        self.start = time.perf_counter()
+
+        # depth, time and nodes of the record which started the current streak of correct moves
+        self.streak = 0
+        self.streak_start = None
+        self._depth = None
+        self.solved = False
+
+    def correct(self, move):
+        if self.best and move not in self.best:
+            return False
+        return move not in self.avoid
+
+    def update(self, record):
+        # called on the reader thread for each info line. returns True once the position counts as solved
+        if record.multipv != 1 or not record.pv or record.depth is None or record.depth == self._depth:
+            return False
+        self._depth = record.depth
+
+        if not self.correct(record.pv[0]):
+            self.streak = 0
+            self.streak_start = None
+            return False
+
+        if self.streak == 0:
+            elapsed = record.time if record.time is not None else (time.perf_counter() - self.start) * 1000
+            self.streak_start = (record.depth, elapsed, record.nodes)
+        self.streak += 1
+        self.solved = self.streak >= self.consecutive
+        return self.solved
+
+    def finish(self, bestmove):
+        # a search which ended with the correct move counts as solved even if it did not reach enough depths
+        if not self.solved and bestmove is not None and self.correct(bestmove) and self.streak_start is not None:
+            self.solved = True
+        return self.solved
+
+
+class EpdRunner:
+
+    def __init__(self, engines, limit, concurrency, consecutive, timeout=600):
+        # maps names to configured engines
+        self.engines = engines
+        self.limit = limit
+        self.concurrency = concurrency
+        self.consecutive = consecutive
+        self.timeout = timeout
+
+        # engine name -> list of (position index, solved, time in ms, nodes)
+        self.results = {name: [] for name in engines}
+        self._lock = threading.Lock()
+
+    def run(self, suite):
+        tasks = Queue()
+        for index in range(len(suite)):
+            for name in self.engines:
+                tasks.put((name, index))
+
+        self.progress = Progress(tasks.qsize())
+        threads = [threading.Thread(target=self._work, args=(tasks, suite), daemon=True)
+                   for _ in range(self.concurrency)]
+        for thread in threads:
+            tasks.put(None)
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.results
+
+    def _work(self, tasks, suite):
+        # every worker keeps its own instance of each engine
+        instances = {}
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            name, index = task
+
+            if name not in instances or instances[name] is None or not instances[name].is_running:
+                instances[name] = spawn(self.engines[name])
+            engine = instances[name]
+
+            board, operations = suite[index]
+            attempt = Attempt(board, operations, self.consecutive)
+            solved, elapsed, nodes = False, None, None
+            if engine is not None:
+                result = engine.search_wait(board.fen(), '', self.limit, self.timeout, on_info=attempt.update)
+                if attempt.finish(result.bestmove if result is not None else None):
+                    solved = True
+                    _, elapsed, nodes = attempt.streak_start
+
+            with self._lock:
+                self.results[name].append((index, solved, elapsed, nodes))
+            self.progress.advance()
+
+        for engine in instances.values():
+            if engine is not None:
+                engine.exit()
+
+
+def print_report(results, total, stream=sys.stdout):
+    stream.write(f"{'engine':<24} {'solved':>10} {'rate':>8} {'avg time [ms]':>14} {'avg nodes':>14}\n")
+    for name, entries in results.items():
+        solved = [entry for entry in entries if entry[1]]
+        times = [entry[2] for entry in solved if entry[2] is not None]
+        nodes = [entry[3] for entry in solved if entry[3] is not None]
+        average_time = f"{sum(times) / len(times):.0f}" if times else '-'
+        average_nodes = f"{sum(nodes) / len(nodes):.0f}" if nodes else '-'
+        stream.write(f"{name:<24} {f'{len(solved)}/{total}':>10} {len(solved) / max(total, 1) * 100:>7.1f}% "
+                     f"{average_time:>14} {average_nodes:>14}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='runs an epd test suite')
+    parser.add_argument('epd', help='the test suite')
+    parser.add_argument('-e', '--engine', action='append', help='engine to test (default: all configured)')
+    parser.add_argument('-c', '--concurrency', type=int, default=os.cpu_count(), help='engines running at once')
+    parser.add_argument('-k', '--consecutive', type=int, default=3,
+                        help='depths the best move has to stay correct to stop early')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds an engine may take for a position')
+    add_engine_arguments(parser)
+    add_limit_arguments(parser)
+    args = parser.parse_args()
+    set_io_backend(args)
+
+    configured = load_engines(args.engines).engines
+    names = args.engine or [name for name in configured if configured[name].settings['bin']]
+    for name in names:
+        if name not in configured:
+            sys.exit(f"unknown engine '{name}', configured engines: {', '.join(configured)}")
+
+    # without a limit each position gets 10 seconds
+    limit = SearchLimit(depth=args.depth, nodes=args.nodes, movetime=args.movetime)
+    if limit.go_command() == "go infinite":
+        limit.movetime = 10000
+
+    suite = read_suite(args.epd)
+    runner = EpdRunner({name: configured[name] for name in names}, limit, args.concurrency, args.consecutive,
+                       args.timeout)
+    print_report(runner.run(suite), len(suite))
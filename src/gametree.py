@@ -0,0 +1,143 @@
+import chess
+
+
+class GameNode:
+
+    def __init__(self, parent=None, move=None, board=None):
+        # a position of the game. the root has no move, every other node is reached by playing its move in the parent
+        self.parent = parent
+        self.move = move
+        self.ply = 0 if parent is None else parent.ply + 1
+        # the first child continues the main line, the others are variations
+        self.children = []
+        # the child the cursor went back from last. moving forward continues there
+        self.next = None
+        self._board = board
+
+    def board(self):
+        # the position after the move. it is built from the parent on first use and kept afterwards, so stepping
+        # through a game never replays it from the start. the board is shared by the tree and read-only: changing it
+        # would change the boards built from it later. its move stack is truncated to the move of the node, use
+        # history_board() or GameTree.follow() for a board with the whole game
+        if self._board is None:
+            # builds the boards from the closest node which has one
+            path = []
+            node = self
+            while node._board is None:
+                path.append(node)
+                node = node.parent
+            for node in reversed(path):
+                node._board = node.parent._board.copy(stack=False)
+                node._board.push(node.move)
+        return self._board
+
+    def history_board(self):
+        # a board of the position which the caller may change. its move stack holds all moves from the start of the
+        # game, so it can be popped or asked for repetitions. the moves are replayed from the root, so this takes
+        # as long as the game and is only used for jumps
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        board = node.board().copy()
+        for move in self.moves():
+            board.push(move)
+        return board
+
+    def child(self, move):
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+    def variations(self):
+        return self.children[1:]
+
+    def is_main_line(self):
+        node = self
+        while node.parent is not None:
+            if node.parent.children[0] is not node:
+                return False
+            node = node.parent
+        return True
+
+    def moves(self, ancestor=None):
+        # the moves from the ancestor (the root if None) to this node. None if the node does not descend from it
+        moves = []
+        node = self
+        while node is not ancestor and node.parent is not None:
+            if ancestor is not None and node.ply <= ancestor.ply:
+                return None
+            moves.append(node.move)
+            node = node.parent
+        if ancestor is not None and node is not ancestor:
+            return None
+        return moves[::-1]
+
+
+class GameTree:
+
+    def __init__(self, board=None):
+        # the game starts at the given position. the tree keeps a copy, so the board can still be changed
+        self.root = GameNode(board=board.copy() if board is not None else chess.Board())
+        self.cursor = self.root
+        self.size = 1
+
+    def board(self):
+        return self.cursor.board()
+
+    def play(self, move):
+        # moves the cursor to the node of the move. a move which has not been played here before starts a variation,
+        # the line which has been there stays the main line
+        node = self.cursor.child(move)
+        if node is None:
+            node = GameNode(self.cursor, move)
+            self.cursor.children.append(node)
+            self.size += 1
+        self.cursor.next = node
+        self.cursor = node
+        return node
+
+    def back(self):
+        if self.cursor.parent is None:
+            return False
+        self.cursor.parent.next = self.cursor
+        self.cursor = self.cursor.parent
+        return True
+
+    def forward(self):
+        # continues with the line the cursor came from last (the main line if it did not come from anywhere)
+        node = self.cursor.next
+        if node is None and self.cursor.children:
+            node = self.cursor.children[0]
+        if node is None:
+            return False
+        self.cursor = node
+        return True
+
+    def to_start(self):
+        # the path back is remembered, so forward steps return into the same line
+        while self.back():
+            pass
+
+    def to_end(self):
+        while self.forward():
+            pass
+
+    def jump_to(self, node):
+        self.cursor = node
+
+    def follow(self, board, previous):
+        # brings a board with the whole game on its move stack (see GameNode.history_board) from the node previous to
+        # the cursor and returns it. a single step pushes or pops the move, only other jumps rebuild the board
+        if self.cursor.parent is previous and previous is not None:
+            board.push(self.cursor.move)
+            return board
+        if previous is not None and previous.parent is self.cursor and board.move_stack:
+            board.pop()
+            return board
+        if previous is self.cursor:
+            return board
+        return self.cursor.history_board()
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import threading
+
+# the cache is stored next to the engine configuration
+HANDSHAKE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "handshakes.json")
+
+
+def fingerprint(path):
+    # identifies the binary by its path, size and modification time, a rebuilt binary changes at least one of them.
+    # the content is not read, binaries with an embedded network are large. returns None if it does not exist. a
+    # bare command like 'stockfish' is looked up in PATH the same way the process is started
+    try:
+        path = os.path.abspath(shutil.which(path) or path)
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+class HandshakeCache:
+
+    def __init__(self, path=HANDSHAKE_CACHE):
+        # maps the fingerprint of a binary to the name, author and options it answered to 'uci'
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            with open(path) as handle:
+                self._entries = json.load(handle)['engines']
+        except (OSError, ValueError, KeyError, TypeError):
+            self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, binary):
+        # returns (information, options) or None if the binary is unknown or changed
+        key = fingerprint(binary)
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(entry['information']), entry['options']
+
+    def store(self, binary, information, options):
+        key = fingerprint(binary)
+        if key is None:
+            return
+        with self._lock:
+            # entries of a previous build of the same binary are outdated
+            path = key.split('|', 1)[0]
+            self._entries = {other: entry for other, entry in self._entries.items()
+                             if other.split('|', 1)[0] != path}
+            self._entries[key] = {'information': information, 'options': options}
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _save(self):
+        # writes to a temporary file first so an interruption never leaves a broken cache behind
+        temp = self.path + '.tmp'
+        try:
+            with open(temp, 'w') as handle:
+                json.dump({'engines': self._entries}, handle)
+            os.replace(temp, self.path)
+        except OSError:
+            pass
+
+
+_handshake_cache = None
+_handshake_cache_lock = threading.Lock()
+
+
+def handshake_cache():
+    # the cache shared by all engines. it is loaded on first use
+    global _handshake_cache
+    with _handshake_cache_lock:
+        if _handshake_cache is None:
+            _handshake_cache = HandshakeCache()
+        return _handshake_cache
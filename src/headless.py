@@ -0,0 +1,89 @@
+# helpers for the tools which drive engines without the gui
+import sys
+import threading
+import time
+
+import engines
+from engines import ENGINES_XML, Engines, SearchLimit
+
+
+def load_engines(path=ENGINES_XML):
+    engines = Engines()
+    engines.read_xml(path)
+    return engines
+
+
+def load_engine(name, path=ENGINES_XML):
+    # returns the configured engine or exits with a message if it does not exist
+    engines = load_engines(path)
+    if name not in engines.engines:
+        sys.exit(f"unknown engine '{name}', configured engines: {', '.join(engines.engines)}")
+    return engines.engines[name]
+
+
+def spawn(engine):
+    # starts a copy of the configured engine so several instances can run next to each other
+    instance = engine.clone()
+    if not instance.start():
+        return None
+    instance.send_options()
+    if not instance.is_ready():
+        instance.exit()
+        return None
+    return instance
+
+
+def add_engine_arguments(parser):
+    parser.add_argument('--engines', default=ENGINES_XML, help='engine configuration (default: %(default)s)')
+    parser.add_argument('--io', choices=('thread', 'selector'), default=engines.ENGINE_IO_BACKEND,
+                        help='read the engine output with a thread per engine or one shared selector loop')
+
+
+def set_io_backend(args):
+    # must be called before the engines are loaded
+    engines.ENGINE_IO_BACKEND = args.io
+
+
+def add_limit_arguments(parser):
+    parser.add_argument('--depth', type=int, help='search depth per position')
+    parser.add_argument('--nodes', type=int, help='nodes per position')
+    parser.add_argument('--movetime', type=int, help='milliseconds per position')
+
+
+def limit_from_arguments(args):
+    if args.depth is None and args.nodes is None and args.movetime is None:
+        sys.exit("a limit is required (--depth, --nodes or --movetime)")
+    return SearchLimit(depth=args.depth, nodes=args.nodes, movetime=args.movetime)
+
+
+class Progress:
+
+    def __init__(self, total, unit='positions', interval=5.0, stream=sys.stderr):
+        # reports the progress and the throughput every interval seconds
+        self.total = total
+        self.unit = unit
+        self.interval = interval
+        self.stream = stream
+        self.done = 0
+
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._last_report = self._start
+
+    def rate(self):
+        elapsed = time.perf_counter() - self._start
+        return self.done / elapsed if elapsed > 0 else 0
+
+    def advance(self, count=1):
+        # can be called from any thread
+        with self._lock:
+            self.done += count
+            now = time.perf_counter()
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+        self.report()
+
+    def report(self):
+        self.stream.write(f"{self.done}/{self.total} {self.unit}, {self.rate():.1f} {self.unit}/s\n")
+        self.stream.flush()
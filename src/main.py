@@ -90,6 +90,15 @@ class MainWindow(QMainWindow):
         self.getAnalyseWidget().reload_engines()
 
 
+    def closeEvent(self, event):
+        # terminate the engines kept warm by the pool
+        self.getEngineConfigWidget().engine_pool.shutdown()
+        # write the pending changes of the engine configuration
+        self.getEngineConfigWidget().config_writer.close()
+        # write the remaining analysis to disk
+        self.getAnalyseWidget().analysis_store.close()
+        QMainWindow.closeEvent(self, event)
+
     def eventFilter(self, source, event):
         if source == self.title_frame:
             # check if lmb is pressed
@@ -0,0 +1,391 @@
+# plays games between two engines under a time control. games are played in pairs (each opening with both colours)
+# and several pairs run at once, limited by the amount of cores the engines may use
+#
+#   python match.py -e Stockfish -e Koivisto --games 200 --tc 10+0.1 --openings book.epd --cores 8 -o games.pgn
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from queue import Queue
+
+import chess
+import chess.pgn
+
+from headless import add_engine_arguments, load_engines, set_io_backend, spawn
+from engines import SearchLimit
+
+
+class TimeControl:
+
+    def __init__(self, base, increment=0):
+        # both given in milliseconds
+        self.base = base
+        self.increment = increment
+
+    @staticmethod
+    def parse(text):
+        # parses 'base+increment' in seconds, e.g. '10+0.1' or '60'
+        base, _, increment = text.partition('+')
+        return TimeControl(int(float(base) * 1000), int(float(increment or 0) * 1000))
+
+    def __str__(self):
+        return f"{self.base / 1000:g}+{self.increment / 1000:g}"
+
+
+def read_openings(path):
+    # returns a list of (root fen, moves) from an epd or pgn file. without a file, the start position is used
+    if path is None:
+        return [(chess.STARTING_FEN, [])]
+
+    openings = []
+    with open(path, encoding='utf8', errors='replace') as handle:
+        if path.lower().endswith('.epd'):
+            for line in handle:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    board = chess.Board()
+                    try:
+                        board.set_epd(line)
+                    except ValueError as error:
+                        sys.stderr.write(f"skipping invalid epd '{line}': {error}\n")
+                        continue
+                    openings.append((board.fen(), []))
+        else:
+            while True:
+                game = chess.pgn.read_game(handle)
+                if game is None:
+                    break
+                openings.append((game.board().fen(), list(game.mainline_moves())))
+    return openings
+
+
+def elo(score):
+    # converts an expected score into an elo difference
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_with_error(wins, losses, draws):
+    # returns the elo difference and the size of its 95% confidence interval
+    games = wins + losses + draws
+    if games == 0:
+        return 0, 0
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + losses * score ** 2 + draws * (0.5 - score) ** 2) / games
+    deviation = math.sqrt(variance / games)
+    return elo(score), (elo(score + 1.96 * deviation) - elo(score - 1.96 * deviation)) / 2
+
+
+def format_score(record, turn):
+    # formats the score of the record from the view of white like +0.35/18 or +M3/25
+    sign = 1 if turn == chess.WHITE else -1
+    if record.score_mate is not None:
+        mate = record.score_mate * sign
+        score = f"{'+' if mate > 0 else '-'}M{abs(mate)}"
+    else:
+        score = f"{record.score_cp * sign / 100:+.2f}"
+    return f"{score}/{record.depth}"
+
+
+class Adjudicator:
+
+    def __init__(self, resign_score=None, resign_moves=3, draw_score=None, draw_moves=8, draw_movenumber=40,
+                 material=True, repetitions=3):
+        # resign once both engines agree the score is beyond resign_score centipawns for resign_moves moves
+        self.resign_score = resign_score
+        self.resign_moves = resign_moves
+        # draw once both engines report at most draw_score centipawns for draw_moves moves after draw_movenumber
+        self.draw_score = draw_score
+        self.draw_moves = draw_moves
+        self.draw_movenumber = draw_movenumber
+        # draw on insufficient material and once a position occurred this often (0 disables it)
+        self.material = material
+        self.repetitions = repetitions
+        self.reset()
+
+    def reset(self):
+        # consecutive plies in which the score was decisive (signed by the winning side) or drawish
+        self._resign_plies = 0
+        self._resign_sign = 0
+        self._draw_plies = 0
+
+    def update(self, board, record, mover):
+        # called after each move with the info of the engine which played it. returns (result, reason) or None
+        if self.material and board.is_insufficient_material():
+            return '1/2-1/2', 'adjudication: insufficient material'
+        if self.repetitions and board.is_repetition(self.repetitions):
+            return '1/2-1/2', 'adjudication: repetition'
+
+        # without a score we cannot tell if the engines agree
+        if record is None or not record.has_score():
+            self.reset()
+            return None
+
+        # the score from the view of white
+        sign = 1 if mover == chess.WHITE else -1
+        if record.score_mate is not None:
+            score = (100000 if record.score_mate > 0 else -100000) * sign
+        else:
+            score = record.score_cp * sign
+
+        if self.resign_score is not None and abs(score) >= self.resign_score:
+            direction = 1 if score > 0 else -1
+            self._resign_plies = self._resign_plies + 1 if direction == self._resign_sign else 1
+            self._resign_sign = direction
+            # both engines need to agree, so count the plies of both sides
+            if self._resign_plies >= 2 * self.resign_moves:
+                return ('1-0' if direction > 0 else '0-1'), 'adjudication: resign'
+        else:
+            self._resign_plies = 0
+            self._resign_sign = 0
+
+        if self.draw_score is not None and board.fullmove_number >= self.draw_movenumber \
+                and abs(score) <= self.draw_score:
+            self._draw_plies += 1
+            if self._draw_plies >= 2 * self.draw_moves:
+                return '1/2-1/2', 'adjudication: draw'
+        else:
+            self._draw_plies = 0
+        return None
+
+
+def play_game(players, names, opening, time_control, margin=100, timeout=60, adjudicator=None):
+    # plays a single game. players and names are given as (white, black). returns the finished pgn game
+    root, book = opening
+    board = chess.Board(root)
+    for move in book:
+        board.push(move)
+
+    game = chess.pgn.Game()
+    game.setup(chess.Board(root))
+    node = game
+    for move in book:
+        node = node.add_variation(move)
+        node.comment = 'book'
+    game.headers['White'], game.headers['Black'] = names
+    game.headers['TimeControl'] = str(time_control)
+
+    for player in players:
+        player.new_game()
+    if adjudicator is not None:
+        adjudicator.reset()
+
+    clocks = [time_control.base, time_control.base]
+    result, termination = None, None
+    while result is None:
+        # claiming a threefold repetition is expensive, the adjudicator checks the repetitions itself unless it was
+        # turned off. the fifty move rule is cheap and always claimed
+        outcome = board.outcome(claim_draw=False)
+        if outcome is None and board.can_claim_fifty_moves():
+            outcome = chess.Outcome(chess.Termination.FIFTY_MOVES, None)
+        if outcome is None and (adjudicator is None or not adjudicator.repetitions) \
+                and board.can_claim_threefold_repetition():
+            outcome = chess.Outcome(chess.Termination.THREEFOLD_REPETITION, None)
+        if outcome is not None:
+            result, termination = outcome.result(), outcome.termination.name.lower()
+            break
+
+        side = 0 if board.turn == chess.WHITE else 1
+        player = players[side]
+        limit = SearchLimit(wtime=max(clocks[0], 1), btime=max(clocks[1], 1),
+                            winc=time_control.increment, binc=time_control.increment)
+
+        start = time.perf_counter()
+        search = player.search_wait(root, ' '.join(move.uci() for move in board.move_stack), limit,
+                                    timeout=clocks[side] / 1000 + timeout)
+        elapsed = int((time.perf_counter() - start) * 1000)
+        clocks[side] -= elapsed
+
+        loss = '0-1' if side == 0 else '1-0'
+        if search is None:
+            result, termination = loss, 'stalled connection' if player.is_running else 'disconnect'
+            break
+        if clocks[side] + margin < 0:
+            result, termination = loss, 'time forfeit'
+            break
+        try:
+            move = chess.Move.from_uci(search.bestmove)
+        except (ValueError, TypeError):
+            move = None
+        if move is None or move not in board.legal_moves:
+            result, termination = loss, 'illegal move'
+            break
+        clocks[side] += time_control.increment
+
+        board.push(move)
+        node = node.add_variation(move)
+        comment = f"{elapsed / 1000:.3f}s"
+        if search.info() is not None and search.info().has_score():
+            comment = f"{format_score(search.info(), not board.turn)} {comment}"
+        node.comment = comment
+
+        # the scores the engines reported decide if the game is finished early
+        if adjudicator is not None:
+            adjudicated = adjudicator.update(board, search.info(), not board.turn)
+            if adjudicated is not None:
+                result, termination = adjudicated
+
+    game.headers['Result'] = result
+    game.headers['Termination'] = termination
+    return game
+
+
+class Match:
+
+    def __init__(self, engines, names, time_control, openings, games, cores, output=None, stream=sys.stdout,
+                 adjudication=None):
+        # engines maps the names to the configured engines. names are the two players
+        # adjudication contains the arguments for an Adjudicator or None to play all games until the end
+        self.engines = engines
+        self.adjudication = adjudication
+        self.names = names
+        self.time_control = time_control
+        self.openings = openings
+        self.games = games
+        self.output = output
+        self.stream = stream
+
+        # each game needs the threads of both engines
+        threads = sum(int(engines[name].settings['options'].get('Threads', {}).get('value', 1) or 1)
+                      for name in names)
+        self.concurrency = max(1, cores // threads)
+
+        # results from the view of the first engine
+        self.wins = self.losses = self.draws = 0
+        self.played = 0
+        self.adjudicated = 0
+        self.stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self):
+        # schedule pairs of games, both colours with the same opening
+        pairs = Queue()
+        for index in range((self.games + 1) // 2):
+            pairs.put(index)
+
+        threads = [threading.Thread(target=self._work, args=(pairs,), daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            pairs.put(None)
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.report()
+
+    def _work(self, pairs):
+        players = {}
+        adjudicator = Adjudicator(**self.adjudication) if self.adjudication is not None else None
+        while not self.stopped.is_set():
+            index = pairs.get()
+            if index is None:
+                break
+
+            # restart engines which crashed
+            for name in self.names:
+                if name not in players or players[name] is None or not players[name].is_running:
+                    players[name] = spawn(self.engines[name])
+            if any(players[name] is None for name in self.names):
+                sys.stderr.write("could not start the engines\n")
+                self.stopped.set()
+                break
+
+            opening = self.openings[index % len(self.openings)]
+            scores = []
+            for swap in range(2):
+                if index * 2 + swap >= self.games or self.stopped.is_set():
+                    break
+                names = (self.names[swap], self.names[1 - swap])
+                game = play_game((players[names[0]], players[names[1]]), names, opening, self.time_control,
+                                 adjudicator=adjudicator)
+                game.headers['Round'] = str(index * 2 + swap + 1)
+                scores.append(self._record(game, swap))
+            self._pair_finished(index, scores)
+
+        for player in players.values():
+            if player is not None:
+                player.exit()
+
+    def _record(self, game, swap):
+        # stores the result of the game and returns the score of the first engine
+        result = game.headers['Result']
+        score = {'1-0': 1.0, '0-1': 0.0}.get(result, 0.5)
+        if swap:
+            score = 1 - score
+
+        with self._lock:
+            if score == 1:
+                self.wins += 1
+            elif score == 0:
+                self.losses += 1
+            else:
+                self.draws += 1
+            self.played += 1
+            if game.headers['Termination'].startswith('adjudication'):
+                self.adjudicated += 1
+            if self.output is not None:
+                with open(self.output, 'a', encoding='utf8') as handle:
+                    print(game, file=handle, end="\n\n")
+            self.report()
+        return score
+
+    def _pair_finished(self, index, scores):
+        # called once both games of a pair have been played
+        pass
+
+    def report(self):
+        total = max(self.played, 1)
+        difference, error = elo_with_error(self.wins, self.losses, self.draws)
+        self.stream.write(f"Score of {self.names[0]} vs {self.names[1]}: {self.wins} - {self.losses} - {self.draws} "
+                          f"[{(self.wins + self.draws / 2) / total:.3f}] {self.played}\n")
+        self.stream.write(f"Elo difference: {difference:.1f} +/- {error:.1f}, adjudicated: {self.adjudicated}\n")
+        self.stream.flush()
+
+
+def add_match_arguments(parser):
+    parser.add_argument('-e', '--engine', action='append', required=True, help='the two engines to play')
+    parser.add_argument('--tc', default='10+0.1', help='time control in seconds as base+increment')
+    parser.add_argument('--openings', help='epd or pgn file with the openings')
+    parser.add_argument('--cores', type=int, default=os.cpu_count(), help='cores the engines may use')
+    parser.add_argument('-o', '--output', help='pgn file the games are appended to')
+    parser.add_argument('--resign-score', type=int, help='centipawns both engines must agree on to resign')
+    parser.add_argument('--resign-moves', type=int, default=3, help='moves the resign score must hold')
+    parser.add_argument('--draw-score', type=int, help='centipawns both engines must stay below to draw')
+    parser.add_argument('--draw-moves', type=int, default=8, help='moves the draw score must hold')
+    parser.add_argument('--draw-movenumber', type=int, default=40, help='first move a draw can be adjudicated')
+    parser.add_argument('--repetitions', type=int, default=3, help='repetitions adjudicated as draw (0 disables)')
+    parser.add_argument('--no-adjudication', action='store_true', help='play all games until the end')
+    add_engine_arguments(parser)
+
+
+def engines_from_arguments(args):
+    set_io_backend(args)
+    configured = load_engines(args.engines).engines
+    if len(args.engine) != 2:
+        sys.exit("exactly two engines are required")
+    for name in args.engine:
+        if name not in configured:
+            sys.exit(f"unknown engine '{name}', configured engines: {', '.join(configured)}")
+    if args.engine[0] == args.engine[1]:
+        sys.exit("the engines must be different")
+    return configured, tuple(args.engine)
+
+
+def adjudication_from_arguments(args):
+    if args.no_adjudication:
+        return None
+    return {'resign_score': args.resign_score, 'resign_moves': args.resign_moves, 'draw_score': args.draw_score,
+            'draw_moves': args.draw_moves, 'draw_movenumber': args.draw_movenumber,
+            'repetitions': args.repetitions}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='plays a match between two engines')
+    parser.add_argument('-n', '--games', type=int, default=100, help='the amount of games to play')
+    add_match_arguments(parser)
+    args = parser.parse_args()
+
+    configured, names = engines_from_arguments(args)
+    match = Match(configured, names, TimeControl.parse(args.tc), read_openings(args.openings), args.games,
+                  args.cores, args.output, adjudication=adjudication_from_arguments(args))
+    match.run()
@@ -0,0 +1,50 @@
+import chess
+
+
+class MoveIndex:
+
+    def __init__(self, board):
+        # the legal moves of one position, grouped by the squares a click can refer to. promotions share the same
+        # from and to square, so each (from, to) pair maps to all of its moves
+        self.pairs = {}
+        # maps a square to the pairs which start or end on it
+        self.pairs_from = {}
+        self.pairs_to = {}
+
+        for move in board.legal_moves:
+            pair = (move.from_square, move.to_square)
+            moves = self.pairs.get(pair)
+            if moves is None:
+                self.pairs[pair] = moves = []
+                self.pairs_from.setdefault(move.from_square, []).append(pair)
+                self.pairs_to.setdefault(move.to_square, []).append(pair)
+            moves.append(move)
+
+    def __contains__(self, move):
+        return move in self.pairs.get((move.from_square, move.to_square), ())
+
+    def __len__(self):
+        return sum(len(moves) for moves in self.pairs.values())
+
+    def moves(self, sq_from, sq_to):
+        # all moves between the two squares, more than one if the piece can promote
+        return self.pairs.get((sq_from, sq_to), [])
+
+    def moves_from(self, square):
+        return [move for pair in self.pairs_from.get(square, ()) for move in self.pairs[pair]]
+
+    def sources(self, square):
+        # the squares from which a piece can move to the given square
+        return [pair[0] for pair in self.pairs_to.get(square, ())]
+
+    def targets(self, square):
+        # the squares the piece on the given square can move to
+        return [pair[1] for pair in self.pairs_from.get(square, ())]
+
+    def promotion(self, sq_from, sq_to, piece_type=chess.QUEEN):
+        # the move which promotes to the given piece (the only move if it is no promotion)
+        moves = self.moves(sq_from, sq_to)
+        for move in moves:
+            if move.promotion == piece_type:
+                return move
+        return moves[0] if moves else None
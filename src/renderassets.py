@@ -0,0 +1,78 @@
+import chess
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt
+
+import res
+
+BOARD_IMAGE = ":/boards/images/board.png"
+
+
+def piece_path(piece):
+    return f'://pieces//images//{"w" if piece.color == chess.WHITE else "b"}{piece.symbol().lower()}.png'
+
+
+# the decoded artwork, shared by all boards. it is loaded on first use since pixmaps need a running application
+_sources = {}
+
+
+def _source(path):
+    if path not in _sources:
+        _sources[path] = QPixmap(path)
+    return _sources[path]
+
+
+class RenderAssets:
+
+    def __init__(self):
+        # maps (piece symbol, colour, cell size, device pixel ratio, smooth) to the scaled piece. only one size is kept
+        # since the board only shows one size at a time. pieces which are not smooth are scaled quickly, e.g. while
+        # the window is resized
+        self._pieces = {}
+        # the scaled board with its (width, height, device pixel ratio, smooth)
+        self._board = None
+        self._board_key = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _scale(self, pixmap, width, height, ratio, smooth, mode=Qt.KeepAspectRatio):
+        # scales to the physical size so high dpi screens get sharp artwork
+        scaled = pixmap.scaled(max(1, round(width * ratio)), max(1, round(height * ratio)), mode,
+                               Qt.SmoothTransformation if smooth else Qt.FastTransformation)
+        scaled.setDevicePixelRatio(ratio)
+        return scaled
+
+    def piece(self, piece, size, ratio=1.0, smooth=True):
+        key = (piece.symbol(), piece.color, int(size), ratio, smooth)
+        pixmap = self._pieces.get(key)
+        if pixmap is not None:
+            self.hits += 1
+            return pixmap
+        self.misses += 1
+        pixmap = self._scale(_source(piece_path(piece)), int(size), int(size), ratio, smooth)
+        self._pieces[key] = pixmap
+        return pixmap
+
+    def board(self, width, height, ratio=1.0, smooth=True):
+        key = (int(width), int(height), ratio, smooth)
+        if self._board_key == key:
+            self.hits += 1
+            return self._board
+        self.misses += 1
+        self._board = self._scale(_source(BOARD_IMAGE), int(width), int(height), ratio, smooth, Qt.IgnoreAspectRatio)
+        self._board_key = key
+        return self._board
+
+    def warm(self, size, ratio=1.0, smooth=True):
+        # scales all pieces for the given cell size so the next refresh does not need to
+        for color in chess.COLORS:
+            for piece_type in chess.PIECE_TYPES:
+                self.piece(chess.Piece(piece_type, color), size, ratio, smooth)
+
+    def invalidate(self, size=None, ratio=None):
+        # drops all pieces which do not have the given size (all pieces without a size)
+        self._pieces = {key: pixmap for key, pixmap in self._pieces.items()
+                        if size is not None and key[2] == int(size) and key[3] == ratio}
+
+    def stats(self):
+        return {'pieces': len(self._pieces), 'hits': self.hits, 'misses': self.misses}
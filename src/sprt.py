@@ -0,0 +1,98 @@
+# plays an engine match until a sequential probability ratio test accepts one of the hypotheses. the games are
+# played in pairs with swapped colours and each pair is counted as one pentanomial outcome
+#
+#   python sprt.py -e Dev -e Base --elo0 0 --elo1 5 --tc 10+0.1 --openings book.epd --cores 8
+import argparse
+import math
+import sys
+
+from match import Match, TimeControl, add_match_arguments, adjudication_from_arguments, engines_from_arguments, \
+    read_openings
+
+# pair scores from the view of the first engine: 0, 0.5, 1, 1.5 and 2 points out of 2 games
+PAIR_SCORES = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def sprt_bounds(alpha, beta):
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def sprt_llr(pentanomial, elo0, elo1):
+    # generalised sprt for logistic elo using the pentanomial frequencies (0 - 2 points per game pair)
+    pairs = sum(pentanomial)
+    if pairs == 0:
+        return 0.0
+
+    # avoid a zero variance if some outcomes have not happened yet
+    counts = [count + 1e-3 for count in pentanomial]
+    total = sum(counts)
+    mean = sum(count * score for count, score in zip(counts, PAIR_SCORES)) / total
+    variance = sum(count * (score - mean) ** 2 for count, score in zip(counts, PAIR_SCORES)) / total
+    if variance <= 0:
+        return 0.0
+
+    score0 = expected_score(elo0)
+    score1 = expected_score(elo1)
+    return pairs * (score1 - score0) * (2 * mean - score0 - score1) / (2 * variance)
+
+
+class SprtMatch(Match):
+
+    def __init__(self, *args, elo0=0, elo1=5, alpha=0.05, beta=0.05, **kwargs):
+        Match.__init__(self, *args, **kwargs)
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower, self.upper = sprt_bounds(alpha, beta)
+
+        # amount of game pairs with 0, 0.5, 1, 1.5 and 2 points for the first engine
+        self.pentanomial = [0] * 5
+        self.llr = 0.0
+        self.decision = None
+
+    def _pair_finished(self, index, scores):
+        # pairs which were cut short by a decision are not counted
+        if len(scores) != 2:
+            return
+
+        with self._lock:
+            self.pentanomial[int(sum(scores) * 2)] += 1
+            self.llr = sprt_llr(self.pentanomial, self.elo0, self.elo1)
+            if self.decision is None:
+                if self.llr >= self.upper:
+                    self.decision = 'H1'
+                elif self.llr <= self.lower:
+                    self.decision = 'H0'
+                if self.decision is not None:
+                    self.stopped.set()
+            self.report()
+
+    def report(self):
+        Match.report(self)
+        self.stream.write(f"Ptnml(0-2): {', '.join(str(count) for count in self.pentanomial)}\n")
+        self.stream.write(f"SPRT: llr {self.llr:.2f} ({self.lower:.2f}, {self.upper:.2f}) "
+                          f"[{self.elo0:g}, {self.elo1:g}]"
+                          f"{'' if self.decision is None else f' - {self.decision} was accepted'}\n")
+        self.stream.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='runs a sprt between two engines')
+    parser.add_argument('--elo0', type=float, default=0, help='elo difference of the null hypothesis')
+    parser.add_argument('--elo1', type=float, default=5, help='elo difference of the alternative hypothesis')
+    parser.add_argument('--alpha', type=float, default=0.05, help='false positive rate')
+    parser.add_argument('--beta', type=float, default=0.05, help='false negative rate')
+    parser.add_argument('-n', '--games', type=int, default=100000, help='the maximum amount of games')
+    add_match_arguments(parser)
+    args = parser.parse_args()
+
+    configured, names = engines_from_arguments(args)
+    match = SprtMatch(configured, names, TimeControl.parse(args.tc), read_openings(args.openings), args.games,
+                      args.cores, args.output, adjudication=adjudication_from_arguments(args),
+                      elo0=args.elo0, elo1=args.elo1, alpha=args.alpha, beta=args.beta)
+    match.run()
+    if match.decision is None:
+        sys.stdout.write("no decision within the maximum amount of games\n")
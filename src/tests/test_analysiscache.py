@@ -0,0 +1,71 @@
+# checks how analyses are keyed and evicted
+#
+#   python -m unittest discover -s tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+from analysiscache import AnalysisCache
+from engines import Engine
+from uciparser import parse_info
+
+
+def engine(binary='stockfish', hash_size=16):
+    engine = Engine(bin=binary)
+    engine.information['name'] = 'Stockfish'
+    engine.settings['options'] = {'Hash': {'type': 'spin', 'default': 16, 'value': hash_size}}
+    return engine
+
+
+class AnalysisCacheTest(unittest.TestCase):
+
+    def test_key(self):
+        board = chess.Board()
+        key = AnalysisCache.key(board, engine())
+        self.assertEqual(key, AnalysisCache.key(chess.Board(), engine()))
+        # another binary or other option values analyse differently
+        self.assertNotEqual(key, AnalysisCache.key(board, engine(binary='stockfish-dev')))
+        self.assertNotEqual(key, AnalysisCache.key(board, engine(hash_size=256)))
+        board.push_uci('e2e4')
+        self.assertNotEqual(key, AnalysisCache.key(board, engine()))
+        # transpositions share their analysis
+        other = chess.Board()
+        for uci in ('g1f3', 'g8f6', 'f3g1', 'f6g8'):
+            other.push_uci(uci)
+        self.assertEqual(AnalysisCache.key(other, engine())[0], key[0])
+
+    def test_keeps_the_deepest_record_of_each_line(self):
+        cache = AnalysisCache()
+        key = AnalysisCache.key(chess.Board(), engine())
+        self.assertTrue(cache.store(key, parse_info('info depth 12 multipv 1 score cp 20 pv e2e4')))
+        self.assertTrue(cache.store(key, parse_info('info depth 10 multipv 2 score cp 15 pv d2d4')))
+        self.assertFalse(cache.store(key, parse_info('info depth 11 multipv 1 score cp 25 pv d2d4')))
+        self.assertFalse(cache.store(key, parse_info('info depth 14 currmove e2e4 currmovenumber 1')))
+        records = cache.lookup(key)
+        self.assertEqual([(record.multipv, record.depth) for record in records], [(1, 12), (2, 10)])
+        self.assertIsNone(cache.lookup(AnalysisCache.key(chess.Board(), engine(hash_size=64))))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_the_least_recently_used_positions(self):
+        cache = AnalysisCache(memory_cap=1000)
+        keys = []
+        board = chess.Board()
+        for uci in ('e2e4', 'e7e5', 'g1f3'):
+            board.push_uci(uci)
+            keys.append(AnalysisCache.key(board, engine()))
+        cache.store(keys[0], parse_info('info depth 5 score cp 0 pv a2a3'))
+        cache.store(keys[1], parse_info('info depth 5 score cp 0 pv a2a3'))
+        cache.lookup(keys[0])
+        cache.store(keys[2], parse_info('info depth 5 score cp 0 pv a2a3'))
+        self.assertIsNotNone(cache.lookup(keys[0]))
+        self.assertIsNone(cache.lookup(keys[1]))
+        self.assertLessEqual(cache.memory, 1000)
+        self.assertEqual(cache.evictions, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# checks that moves played faster than the frames are merged into few transitions and that the number of moving
+# pieces stays bounded
+#
+#   QT_QPA_PLATFORM=offscreen python -m unittest discover -s tests
+import os
+import sys
+import time
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication(sys.argv[:1])
+
+from animationscheduler import AnimationScheduler
+
+GAME = ('e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6 e1g1 f8e7 f1e1 b7b5 a4b3 d7d6 c2c3 e8g8 h2h3 c6a5 b3c2 c7c5 d2d4 '
+        'd8c7 b1d2 c5d4 c3d4 a5c6 d2b3 a6a5 c1e3 a5a4 b3d2 c8d7 a1c1 c7b7 d2f1 f8c8 f1g3 c6b4 c2b1 c8c1 d1c1 a8c8 '
+        'c1d2 e5d4 f3d4 e7f8 a2a3 b4c6 d4c6 d7c6 e3d4 f6d7 g3f5 d7e5 d2g5 e5g6 h3h4 f7f6 g5g4 c6d7').split()
+
+
+class AnimationSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = AnimationScheduler(lambda column, row: None)
+
+    def tearDown(self):
+        self.scheduler.finish()
+
+    def wait_for_frame(self):
+        # lets the timer of the scheduler draw the next frame. transitions started before it all belong to one frame
+        frames = self.scheduler.stats()['frames']
+        deadline = time.monotonic() + 1
+        while self.scheduler.stats()['frames'] == frames and time.monotonic() < deadline:
+            app.processEvents()
+        self.assertGreater(self.scheduler.stats()['frames'], frames)
+
+    def play(self, moves_per_frame):
+        # plays the game one move per transition and draws a frame after every few moves
+        board = chess.Board()
+        for index, uci in enumerate(GAME):
+            before = board.copy(stack=False)
+            board.push_uci(uci)
+            self.scheduler.transition(before, [board.peek()])
+            # a sprite per piece which started the game at most, moving or fading out
+            self.assertLessEqual(len(self.scheduler.sprites), 32)
+            if (index + 1) % moves_per_frame == 0:
+                self.wait_for_frame()
+        return board
+
+    def test_moves_within_a_frame_are_one_transition(self):
+        board = self.play(len(GAME))
+        stats = self.scheduler.stats()
+        self.assertEqual(stats['transitions'], 1)
+        self.assertEqual(stats['moves'], len(GAME))
+        # every piece which is on the board at the end lands on its square
+        self.assertEqual({square: sprite.piece for square, sprite in self.scheduler.hidden.items()},
+                         {square: board.piece_at(square) for square in self.scheduler.hidden})
+
+    def test_sprites_stay_bounded_under_rapid_input(self):
+        self.play(3)
+        stats = self.scheduler.stats()
+        self.assertEqual(stats['transitions'], len(GAME) // 3)
+        self.assertLessEqual(stats['peak'], 32)
+
+    def test_taking_back_within_a_frame_is_one_transition(self):
+        board = chess.Board()
+        for uci in GAME[:10]:
+            board.push_uci(uci)
+        self.scheduler.finish()
+        while board.move_stack:
+            move = board.pop()
+            self.scheduler.transition(board.copy(stack=False), [move], backward=True)
+        self.assertEqual(self.scheduler.stats()['transitions'], 1)
+        self.assertEqual({square: sprite.piece for square, sprite in self.scheduler.hidden.items()},
+                         {square: board.piece_at(square) for square in self.scheduler.hidden})
+
+
+if __name__ == '__main__':
+    unittest.main()
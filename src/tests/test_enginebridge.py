@@ -0,0 +1,54 @@
+# checks that the bridge hands the gui the latest record of each line without losing the score of a line
+#
+#   QT_QPA_PLATFORM=offscreen python -m unittest discover -s tests
+import os
+import sys
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication(sys.argv[:1])
+
+from enginebridge import EngineBridge
+from uciparser import parse_info
+
+
+class EngineBridgeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bridge = EngineBridge()
+        self.delivered = []
+        self.bridge.records_ready.connect(self.delivered.append)
+
+    def test_latest_record_of_each_line(self):
+        for line in ('info depth 1 multipv 1 score cp 10 pv e2e4', 'info depth 1 multipv 2 score cp 5 pv d2d4',
+                     'info depth 2 multipv 1 score cp 20 pv e2e4 e7e5'):
+            self.bridge.submit(parse_info(line))
+        self.bridge.flush()
+        self.assertEqual(len(self.delivered), 1)
+        self.assertEqual([(record.multipv, record.depth) for record in self.delivered[0]], [(1, 2), (2, 1)])
+        self.assertEqual(self.bridge.stats(), {'received': 3, 'coalesced': 1, 'flushes': 1})
+
+    def test_statistics_keep_the_line(self):
+        scored = parse_info('info depth 9 score cp 31 pv g1f3 d7d5')
+        self.bridge.submit(scored)
+        self.bridge.submit(parse_info('info depth 9 currmove b1c3 currmovenumber 4 nodes 7000'))
+        self.bridge.flush()
+        record = self.delivered[0][0]
+        self.assertEqual((record.score_cp, record.pv, record.nodes), (31, ['g1f3', 'd7d5'], 7000))
+        # the submitted record is shared with the caches and stays unchanged
+        self.assertIsNone(scored.nodes)
+
+    def test_nothing_pending(self):
+        self.bridge.flush()
+        self.bridge.submit(parse_info('info depth 1 score cp 0 pv e2e4'))
+        self.bridge.clear()
+        self.bridge.flush()
+        self.assertEqual(self.delivered, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+# checks which options are sent to an engine after its handshake and when the settings change, and how the
+# AsyncEngine searches with the fake engine of the benchmarks
+#
+#   python -m unittest discover -s tests
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+import handshakecache
+from engines import ENGINE_LINE_LIMIT, AsyncEngine, Engine, Protocol, SearchLimit, acknowledged_defaults, \
+    changed_options, merge_options, parse_information
+from handshakecache import HandshakeCache
+
+FAKE_ENGINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fakeengine.py')
+AFTER_E4 = chess.Board('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1')
+
+HANDSHAKE = ['id name Fake', 'id author Nobody',
+             'option name Ponder type check default false',
+             'option name Style type combo default Normal var Solid var Normal var Risky',
+             'option name Hash type spin default 16 min 1 max 1024',
+             'option name Book type string default book.bin',
+             'uciok']
+
+
+class OptionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.information, self.options = parse_information(HANDSHAKE, {'proto': Protocol.UCI})
+        self.settings = {'options': merge_options(self.options, {'options': {}})}
+
+    def test_handshake_is_parsed(self):
+        self.assertEqual(self.information, {'name': 'Fake', 'author': 'Nobody'})
+        self.assertEqual(self.options['Ponder']['default'], False)
+        self.assertEqual(self.options['Style']['default'], 'Normal')
+        self.assertEqual(self.options['Style']['vals'], ['Solid', 'Normal', 'Risky'])
+        self.assertEqual((self.options['Hash']['min'], self.options['Hash']['max']), (1, 1024))
+
+    def test_defaults_are_not_sent(self):
+        self.assertEqual(changed_options(self.settings, acknowledged_defaults(self.options)), {})
+
+    def test_values_from_the_config_are_compared_by_type(self):
+        # engines.xml gives every value back as text
+        for name, value in (('Ponder', 'False'), ('Style', 'Normal'), ('Hash', '16'), ('Book', 'book.bin')):
+            self.settings['options'][name]['value'] = value
+        self.assertEqual(changed_options(self.settings, acknowledged_defaults(self.options)), {})
+
+    def test_changed_values_are_sent(self):
+        self.settings['options']['Ponder']['value'] = 'True'
+        self.settings['options']['Style']['value'] = 'Risky'
+        self.settings['options']['Hash']['value'] = 64
+        self.settings['options']['Book']['value'] = ''
+        self.assertEqual(changed_options(self.settings, acknowledged_defaults(self.options)),
+                         {'Ponder': 'true', 'Style': 'Risky', 'Hash': '64', 'Book': ''})
+
+    def test_unset_values_are_not_sent(self):
+        self.settings['options']['Ponder']['value'] = ''
+        self.settings['options']['Hash']['value'] = None
+        self.assertEqual(changed_options(self.settings, acknowledged_defaults(self.options)), {})
+
+
+class EngineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # the engines of the tests are not remembered in the cache of the gui
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = handshakecache._handshake_cache
+        handshakecache._handshake_cache = HandshakeCache(os.path.join(self.directory.name, 'handshakes.json'))
+
+    def tearDown(self):
+        handshakecache._handshake_cache = self.cache
+        self.directory.cleanup()
+
+
+class AsyncEngineTest(EngineTestCase):
+
+    def run_with_engine(self, test, binary=FAKE_ENGINE):
+        async def run():
+            engine = AsyncEngine(bin=binary, proto=Protocol.UCI)
+            try:
+                return await asyncio.wait_for(test(engine), 10)
+            finally:
+                await engine.exit()
+        return asyncio.run(run())
+
+    def test_search(self):
+        async def test(engine):
+            self.assertTrue(await engine.start())
+            self.assertEqual(engine.information['name'], 'FakeEngine 1.0')
+            result = await engine.search(chess.STARTING_FEN, 'e2e4', SearchLimit(depth=3))
+            self.assertIn(chess.Move.from_uci(result.bestmove), AFTER_E4.legal_moves)
+        self.run_with_engine(test)
+
+    def test_cached_handshake(self):
+        async def test(engine):
+            self.assertTrue(await engine.start())
+            await engine.exit()
+            engine.settings['options']['MultiPV']['value'] = 2
+            self.assertTrue(await engine.start())
+            self.assertEqual(handshakecache.handshake_cache().stats()['hits'], 1)
+            self.assertEqual(engine.applied_options['MultiPV'], '2')
+            result = await engine.search(chess.STARTING_FEN, 'e2e4', SearchLimit(depth=2))
+            self.assertEqual(sorted(result.records), [1, 2])
+        self.run_with_engine(test)
+
+    def test_analyse_until_the_search_finished(self):
+        async def test(engine):
+            await engine.start()
+            async with engine.analyse(chess.STARTING_FEN, limit=SearchLimit(depth=5)) as analysis:
+                depths = [record.depth async for record in analysis if record.pv]
+            self.assertEqual(depths, [1, 2, 3, 4, 5])
+        self.run_with_engine(test)
+
+    def test_leaving_the_analysis_stops_the_search(self):
+        async def test(engine):
+            await engine.start()
+            async with engine.analyse(chess.STARTING_FEN) as analysis:
+                async for record in analysis:
+                    break
+            # the next search runs right away and the best move of the stopped one is not taken for its answer
+            result = await engine.search(chess.STARTING_FEN, 'e2e4', SearchLimit(depth=2))
+            self.assertIn(chess.Move.from_uci(result.bestmove), AFTER_E4.legal_moves)
+            self.assertEqual(result.info().depth, 2)
+        self.run_with_engine(test)
+
+    def test_stop_from_another_task(self):
+        async def test(engine):
+            await engine.start()
+            analysis = engine.analyse(chess.STARTING_FEN)
+
+            async def read():
+                return [record async for record in analysis]
+            reader = asyncio.create_task(read())
+            await asyncio.sleep(0.05)
+            await analysis.stop()
+            self.assertTrue(await reader)
+            result = await engine.search(chess.STARTING_FEN, 'e2e4', SearchLimit(depth=2))
+            self.assertEqual(result.info().depth, 2)
+        self.run_with_engine(test)
+
+    def test_too_long_line_closes_the_waiters(self):
+        # an engine which answers 'uci' with a line the stream can not hold
+        binary = os.path.join(self.directory.name, 'longline.py')
+        with open(binary, 'w') as handle:
+            handle.write(f"#!{sys.executable}\n"
+                         f"import sys\n"
+                         f"sys.stdin.readline()\n"
+                         f"sys.stdout.write('info string ' + 'x' * {ENGINE_LINE_LIMIT * 2} + '\\nuciok\\n')\n"
+                         f"sys.stdout.flush()\n"
+                         f"sys.stdin.read()\n")
+        os.chmod(binary, os.stat(binary).st_mode | stat.S_IXUSR)
+
+        async def test(engine):
+            start = time.monotonic()
+            self.assertFalse(await engine.start(timeout=5))
+            self.assertLess(time.monotonic() - start, 5)
+            self.assertFalse(engine.is_running)
+        self.run_with_engine(test, binary)
+
+
+class EngineTest(EngineTestCase):
+
+    def test_cached_handshake(self):
+        engine = Engine(bin=FAKE_ENGINE)
+        try:
+            self.assertTrue(engine.start())
+            self.assertTrue(engine.is_ready())
+            engine.exit()
+            engine.settings['options']['MultiPV']['value'] = 2
+            self.assertTrue(engine.start())
+            self.assertEqual(handshakecache.handshake_cache().stats()['hits'], 1)
+            # the options went out with the handshake
+            self.assertEqual(engine.applied_options['MultiPV'], '2')
+            self.assertTrue(engine.send_options())
+            self.assertTrue(engine.is_ready())
+            result = engine.search_wait(chess.STARTING_FEN, 'e2e4', SearchLimit(depth=2), timeout=10)
+            self.assertEqual(sorted(result.records), [1, 2])
+        finally:
+            engine.exit()
+
+
+if __name__ == '__main__':
+    unittest.main()
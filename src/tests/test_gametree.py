@@ -0,0 +1,100 @@
+# checks moving through the game tree and the boards which follow the cursor
+#
+#   python -m unittest discover -s tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+from gametree import GameTree
+
+MAIN_LINE = [chess.Move.from_uci(uci) for uci in 'e2e4 e7e5 g1f3 b8c6 f1b5'.split()]
+
+
+class GameTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.game = GameTree(chess.Board())
+        for move in MAIN_LINE:
+            self.game.play(move)
+
+    def test_stepping_back_and_forward(self):
+        self.game.back()
+        self.game.back()
+        self.assertEqual(self.game.cursor.ply, 3)
+        self.game.forward()
+        self.assertEqual(self.game.cursor.move, MAIN_LINE[3])
+        self.game.to_start()
+        self.assertIs(self.game.cursor, self.game.root)
+        self.game.to_end()
+        self.assertEqual(self.game.cursor.moves(), MAIN_LINE)
+
+    def test_variations_keep_the_main_line(self):
+        self.game.back()
+        self.game.play(chess.Move.from_uci('f1c4'))
+        self.assertEqual(len(self.game), len(MAIN_LINE) + 2)
+        self.assertFalse(self.game.cursor.is_main_line())
+        # moving forward continues in the line the cursor came from
+        self.game.back()
+        self.game.forward()
+        self.assertEqual(self.game.cursor.move, chess.Move.from_uci('f1c4'))
+        self.assertEqual(self.game.cursor.parent.children[0].move, MAIN_LINE[-1])
+
+    def test_moves_from_an_ancestor(self):
+        node = self.game.cursor
+        ancestor = node.parent.parent
+        self.assertEqual(node.moves(ancestor), MAIN_LINE[-2:])
+        self.assertIsNone(ancestor.moves(node))
+
+    def test_node_boards(self):
+        board = chess.Board()
+        node = self.game.root
+        for move in MAIN_LINE:
+            board.push(move)
+            node = node.child(move)
+            self.assertEqual(node.board(), board)
+            # the tree only keeps the move of the node
+            self.assertEqual(node.board().move_stack, [move])
+
+    def test_changing_the_start_position_does_not_change_the_tree(self):
+        board = chess.Board()
+        game = GameTree(board)
+        game.play(MAIN_LINE[0])
+        board.remove_piece_at(chess.E2)
+        self.assertEqual(game.root.board(), chess.Board())
+        self.assertEqual(game.cursor.board().piece_at(chess.E4), chess.Piece(chess.PAWN, chess.WHITE))
+
+    def test_follow(self):
+        board = self.game.cursor.history_board()
+        self.assertEqual(board.move_stack, MAIN_LINE)
+        for step in (self.game.back, self.game.back, self.game.forward, self.game.to_start, self.game.to_end,
+                     self.game.back):
+            previous = self.game.cursor
+            step()
+            followed = self.game.follow(board, previous)
+            self.assertEqual(followed, self.game.cursor.board())
+            self.assertEqual(followed.move_stack, self.game.cursor.moves())
+            board = followed
+
+    def test_single_steps_keep_the_board(self):
+        board = self.game.cursor.history_board()
+        previous = self.game.cursor
+        self.game.back()
+        self.assertIs(self.game.follow(board, previous), board)
+        previous = self.game.cursor
+        self.game.forward()
+        self.assertIs(self.game.follow(board, previous), board)
+
+    def test_history_board_detects_repetitions(self):
+        game = GameTree(chess.Board())
+        for uci in 'g1f3 g8f6 f3g1 f6g8 g1f3 g8f6 f3g1 f6g8'.split():
+            game.play(chess.Move.from_uci(uci))
+        self.assertTrue(game.cursor.history_board().is_repetition(3))
+        self.assertFalse(game.cursor.board().is_repetition(3))
+
+
+if __name__ == '__main__':
+    unittest.main()
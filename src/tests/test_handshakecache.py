@@ -0,0 +1,64 @@
+# checks that handshakes are remembered per binary and forgotten once the binary changes
+#
+#   python -m unittest discover -s tests
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handshakecache import HandshakeCache, fingerprint
+
+INFORMATION = {'name': 'Fake 1.0', 'author': 'Nobody'}
+OPTIONS = {'Hash': {'type': 'spin', 'default': 16, 'min': 1, 'max': 1024}}
+
+
+class HandshakeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.binary = os.path.join(self.directory, 'engine')
+        with open(self.binary, 'w') as handle:
+            handle.write('first build')
+        self.path = os.path.join(self.directory, 'handshakes.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_fingerprint(self):
+        self.assertIsNone(fingerprint(os.path.join(self.directory, 'missing')))
+        first = fingerprint(self.binary)
+        self.assertTrue(first.startswith(self.binary))
+        self.assertEqual(fingerprint(os.path.relpath(self.binary)), first)
+        with open(self.binary, 'w') as handle:
+            handle.write('second build')
+        self.assertNotEqual(fingerprint(self.binary), first)
+
+    def test_lookup_and_persistence(self):
+        cache = HandshakeCache(self.path)
+        self.assertIsNone(cache.lookup(self.binary))
+        cache.store(self.binary, INFORMATION, OPTIONS)
+        self.assertEqual(cache.lookup(self.binary), (INFORMATION, OPTIONS))
+        self.assertEqual(cache.stats(), {'entries': 1, 'hits': 1, 'misses': 1})
+        # a new process reads what the previous one stored
+        self.assertEqual(HandshakeCache(self.path).lookup(self.binary), (INFORMATION, OPTIONS))
+
+    def test_rebuilt_binary_replaces_its_entry(self):
+        cache = HandshakeCache(self.path)
+        cache.store(self.binary, INFORMATION, OPTIONS)
+        with open(self.binary, 'w') as handle:
+            handle.write('second build')
+        self.assertIsNone(cache.lookup(self.binary))
+        cache.store(self.binary, {'name': 'Fake 2.0', 'author': 'Nobody'}, OPTIONS)
+        self.assertEqual(len(cache), 1)
+
+    def test_broken_file(self):
+        with open(self.path, 'w') as handle:
+            handle.write('{not json')
+        self.assertEqual(len(HandshakeCache(self.path)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# checks how play_game ends games with scripted players instead of engines and when the adjudicator ends them early
+#
+#   python -m unittest discover -s tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+from match import Adjudicator, TimeControl, play_game
+from uciparser import parse_info
+
+
+class Search:
+
+    def __init__(self, bestmove):
+        self.bestmove = bestmove
+
+    def info(self):
+        return None
+
+
+class Player:
+    # plays the given moves one after another
+
+    def __init__(self, moves):
+        self.moves = list(moves)
+        self.is_running = True
+
+    def new_game(self):
+        pass
+
+    def search_wait(self, root, moves, limit, timeout=None):
+        return Search(self.moves.pop(0))
+
+
+def play(fen, white, black, adjudicator):
+    players = (Player(white), Player(black))
+    game = play_game(players, ('white', 'black'), (fen, []), TimeControl(60000), adjudicator=adjudicator)
+    return game.headers['Result'], game.headers['Termination']
+
+
+class PlayGameTest(unittest.TestCase):
+
+    def test_fifty_moves_end_the_game(self):
+        fen = '8/8/8/4k3/8/8/8/4K2R w K - 98 80'
+        for adjudicator in (None, Adjudicator(), Adjudicator(repetitions=0)):
+            self.assertEqual(play(fen, ['h1h2'], ['e5e6'], adjudicator), ('1/2-1/2', 'fifty_moves'))
+
+    def test_threefold_repetition_is_claimed_without_adjudication(self):
+        shuffle = ['g1f3', 'f3g1'] * 3
+        replies = ['g8f6', 'f6g8'] * 3
+        for adjudicator in (None, Adjudicator(repetitions=0)):
+            result = play(chess.STARTING_FEN, shuffle, replies, adjudicator)
+            self.assertEqual(result, ('1/2-1/2', 'threefold_repetition'))
+        self.assertEqual(play(chess.STARTING_FEN, shuffle, replies, Adjudicator()),
+                         ('1/2-1/2', 'adjudication: repetition'))
+
+
+class AdjudicatorTest(unittest.TestCase):
+
+    def play(self, adjudicator, board, scores):
+        # feeds the scores (from the view of white) as if each side reported them after its move
+        result = None
+        for score in scores:
+            mover = not board.turn
+            record = None if score is None else parse_info(f"info depth 10 score cp {score if mover else -score}")
+            result = adjudicator.update(board, record, mover)
+            board.turn = not board.turn
+            if result is not None:
+                break
+        return result
+
+    def test_resign_once_both_sides_agree(self):
+        adjudicator = Adjudicator(resign_score=600, resign_moves=2)
+        self.assertIsNone(self.play(adjudicator, chess.Board(), [700, 700, 700]))
+        adjudicator.reset()
+        self.assertEqual(self.play(adjudicator, chess.Board(), [-700] * 4), ('0-1', 'adjudication: resign'))
+
+    def test_resign_is_reset_by_a_missing_score(self):
+        adjudicator = Adjudicator(resign_score=600, resign_moves=2)
+        self.assertIsNone(self.play(adjudicator, chess.Board(), [700, 700, None, 700, 700]))
+
+    def test_draw_after_the_move_number(self):
+        adjudicator = Adjudicator(draw_score=10, draw_moves=2, draw_movenumber=40)
+        self.assertIsNone(self.play(adjudicator, chess.Board(), [0] * 8))
+        board = chess.Board()
+        board.fullmove_number = 40
+        self.assertEqual(self.play(adjudicator, board, [0] * 4), ('1/2-1/2', 'adjudication: draw'))
+
+    def test_insufficient_material(self):
+        board = chess.Board('8/8/4k3/8/8/3K4/8/8 b - - 0 60')
+        self.assertEqual(Adjudicator().update(board, None, chess.WHITE),
+                         ('1/2-1/2', 'adjudication: insufficient material'))
+        self.assertIsNone(Adjudicator(material=False).update(board, None, chess.WHITE))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+# checks the lookup of the legal moves by the squares which were clicked
+#
+#   python -m unittest discover -s tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+
+from moveindex import MoveIndex
+
+
+class MoveIndexTest(unittest.TestCase):
+
+    def test_start_position(self):
+        board = chess.Board()
+        index = MoveIndex(board)
+        self.assertEqual(len(index), board.legal_moves.count())
+        self.assertIn(chess.Move.from_uci('g1f3'), index)
+        self.assertNotIn(chess.Move.from_uci('g1g3'), index)
+        self.assertEqual(sorted(index.targets(chess.G1)), [chess.F3, chess.H3])
+        self.assertEqual(sorted(index.sources(chess.F3)), [chess.G1, chess.F2])
+        self.assertEqual(index.moves_from(chess.E1), [])
+        self.assertEqual(index.moves(chess.E2, chess.E5), [])
+
+    def test_promotions_share_their_squares(self):
+        index = MoveIndex(chess.Board('8/1P6/8/8/8/8/8/k6K w - - 0 1'))
+        self.assertEqual(len(index.moves(chess.B7, chess.B8)), 4)
+        self.assertEqual(index.targets(chess.B7), [chess.B8])
+        self.assertEqual(index.promotion(chess.B7, chess.B8), chess.Move.from_uci('b7b8q'))
+        self.assertEqual(index.promotion(chess.B7, chess.B8, chess.KNIGHT), chess.Move.from_uci('b7b8n'))
+        # a move which does not promote is found whatever piece is asked for
+        self.assertEqual(index.promotion(chess.H1, chess.H2), chess.Move.from_uci('h1h2'))
+        self.assertIsNone(index.promotion(chess.H1, chess.H5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# checks the log likelihood ratio of the sprt
+#
+#   python -m unittest discover -s tests
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sprt import expected_score, sprt_bounds, sprt_llr
+
+
+class SprtTest(unittest.TestCase):
+
+    def test_expected_score(self):
+        self.assertAlmostEqual(expected_score(0), 0.5)
+        self.assertAlmostEqual(expected_score(400), 10 / 11)
+        self.assertAlmostEqual(expected_score(-100) + expected_score(100), 1.0)
+
+    def test_bounds(self):
+        lower, upper = sprt_bounds(0.05, 0.05)
+        self.assertAlmostEqual(lower, -math.log(19))
+        self.assertAlmostEqual(upper, math.log(19))
+
+    def test_llr(self):
+        self.assertEqual(sprt_llr([0, 0, 0, 0, 0], 0, 5), 0.0)
+        # an even result is closer to elo0 = 0 than to elo1 = 5
+        self.assertLess(sprt_llr([10, 40, 100, 40, 10], 0, 5), 0)
+        # a clearly better first engine favours elo1
+        self.assertGreater(sprt_llr([5, 20, 80, 60, 35], 0, 5), 0)
+        # twice the pairs with the same frequencies double the evidence
+        llr = sprt_llr([5, 20, 80, 60, 35], 0, 5)
+        self.assertAlmostEqual(sprt_llr([10, 40, 160, 120, 70], 0, 5), 2 * llr, places=3)
+
+    def test_decides_on_a_large_difference(self):
+        lower, upper = sprt_bounds(0.05, 0.05)
+        self.assertGreater(sprt_llr([10, 100, 400, 700, 300], 0, 5), upper)
+        self.assertLess(sprt_llr([300, 700, 400, 100, 10], 0, 5), lower)
+
+
+if __name__ == '__main__':
+    unittest.main()
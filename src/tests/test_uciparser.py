@@ -0,0 +1,53 @@
+# checks the parser of the 'info' lines
+#
+#   python -m unittest discover -s tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uciparser import parse_info
+
+
+class ParseInfoTest(unittest.TestCase):
+
+    def test_full_line(self):
+        record = parse_info('info depth 20 seldepth 31 multipv 2 score cp -35 wdl 40 900 60 nodes 1234567 nps 987654 '
+                            'hashfull 321 tbhits 0 time 1250 pv e2e4 e7e5 g1f3')
+        self.assertEqual((record.depth, record.seldepth, record.multipv), (20, 31, 2))
+        self.assertEqual((record.score_cp, record.score_mate, record.bound), (-35, None, None))
+        self.assertEqual(record.wdl, (40, 900, 60))
+        self.assertEqual((record.nodes, record.nps, record.hashfull, record.tbhits, record.time),
+                         (1234567, 987654, 321, 0, 1250))
+        self.assertEqual(record.pv, ['e2e4', 'e7e5', 'g1f3'])
+
+    def test_mate_and_bounds(self):
+        record = parse_info('info depth 30 score mate -4 upperbound pv h7h8q')
+        self.assertEqual((record.score_cp, record.score_mate, record.bound), (None, -4, 'upperbound'))
+        self.assertTrue(record.has_score())
+        self.assertEqual(parse_info('info depth 12 score cp 15 lowerbound').bound, 'lowerbound')
+
+    def test_statistics_only(self):
+        record = parse_info('info depth 18 currmove g1f3 currmovenumber 3 nodes 5000')
+        self.assertEqual((record.currmove, record.currmovenumber, record.nodes), ('g1f3', 3, 5000))
+        self.assertFalse(record.has_score())
+        self.assertIsNone(record.pv)
+        self.assertEqual(record.multipv, 1)
+
+    def test_other_lines(self):
+        self.assertIsNone(parse_info('bestmove e2e4 ponder e7e5'))
+        self.assertIsNone(parse_info('info string NNUE evaluation enabled'))
+        self.assertIsNone(parse_info(''))
+
+    def test_malformed_lines_keep_what_was_parsed(self):
+        record = parse_info('info depth 7 nodes 900 score cp')
+        self.assertEqual((record.depth, record.nodes), (7, 900))
+        self.assertFalse(record.has_score())
+        record = parse_info('info depth 7 unknown 3 nodes x')
+        self.assertEqual(record.depth, 7)
+        self.assertIsNone(record.nodes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# single pass parser for the 'info' lines of uci engines
+
+# keywords which are followed by a single integer
+_INT_FIELDS = frozenset(['depth', 'seldepth', 'multipv', 'nodes', 'nps', 'tbhits', 'hashfull', 'time',
+                         'currmovenumber'])
+
+
+class InfoRecord:
+    __slots__ = ('depth', 'seldepth', 'multipv', 'score_cp', 'score_mate', 'bound', 'wdl', 'nodes', 'nps',
+                 'tbhits', 'hashfull', 'time', 'currmove', 'currmovenumber', 'pv')
+
+    def __init__(self):
+        self.depth = None
+        self.seldepth = None
+        # the multipv index starts at 1 like in the protocol
+        self.multipv = 1
+        self.score_cp = None
+        self.score_mate = None
+        # 'lowerbound', 'upperbound' or None for exact scores
+        self.bound = None
+        # tuple of (win, draw, loss) in permill
+        self.wdl = None
+        self.nodes = None
+        self.nps = None
+        self.tbhits = None
+        self.hashfull = None
+        self.time = None
+        self.currmove = None
+        self.currmovenumber = None
+        # list of moves in uci notation
+        self.pv = None
+
+    def has_score(self):
+        return self.score_cp is not None or self.score_mate is not None
+
+    def __repr__(self):
+        fields = ', '.join(f'{key}={getattr(self, key)!r}' for key in self.__slots__ if getattr(self, key) is not None)
+        return f'InfoRecord({fields})'
+
+
+def parse_info(line):
+    # parses a single 'info' line into an InfoRecord. returns None for any other line and for 'info string'
+    tokens = line.split()
+    if not tokens or tokens[0] != 'info':
+        return None
+
+    record = InfoRecord()
+    count = len(tokens)
+    i = 1
+    try:
+        while i < count:
+            token = tokens[i]
+            if token in _INT_FIELDS:
+                setattr(record, token, int(tokens[i + 1]))
+                i += 2
+            elif token == 'score':
+                kind = tokens[i + 1]
+                if kind == 'cp':
+                    record.score_cp = int(tokens[i + 2])
+                elif kind == 'mate':
+                    record.score_mate = int(tokens[i + 2])
+                i += 3
+                if i < count and (tokens[i] == 'lowerbound' or tokens[i] == 'upperbound'):
+                    record.bound = tokens[i]
+                    i += 1
+            elif token == 'pv':
+                # the pv is always the last entry of the line
+                record.pv = tokens[i + 1:]
+                break
+            elif token == 'wdl':
+                record.wdl = (int(tokens[i + 1]), int(tokens[i + 2]), int(tokens[i + 3]))
+                i += 4
+            elif token == 'currmove':
+                record.currmove = tokens[i + 1]
+                i += 2
+            elif token == 'string':
+                return None
+            else:
+                # unknown keywords are skipped
+                i += 1
+    except (IndexError, ValueError):
+        # truncated or malformed lines keep everything parsed so far
+        pass
+
+    return record
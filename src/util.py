@@ -7,6 +7,9 @@ from PyQt5.QtWidgets import QApplication, QMainWindow
 def updateStatusBar(text) -> typing.Union[QMainWindow, None]:
     # Global function to find the (open) QMainWindow in application
     app = QApplication.instance()
+    # there is nothing to display if we run without a gui
+    if app is None:
+        return None
     for widget in app.topLevelWidgets():
         if isinstance(widget, QMainWindow):
             widget.statusBar.showMessage(text)
@@ -15,6 +18,8 @@ def updateStatusBar(text) -> typing.Union[QMainWindow, None]:
 # global function to retrieve the main window
 def getMainWindow():
     app = QApplication.instance()
+    if app is None:
+        return None
     for widget in app.topLevelWidgets():
         if isinstance(widget, QMainWindow):
             return widget